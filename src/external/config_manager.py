@@ -11,6 +11,14 @@ import logging
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+try:
+    # libyaml的C实现，比纯Python的SafeLoader快一个数量级
+    from yaml import CSafeLoader as YAMLLoader
+    YAML_CLOADER_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as YAMLLoader
+    YAML_CLOADER_AVAILABLE = False
+
 
 class ConfigManager:
     """
@@ -101,7 +109,7 @@ class ConfigManager:
             if self.config_path.exists():
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     if self.config_path.suffix.lower() == '.yaml' or self.config_path.suffix.lower() == '.yml':
-                        self.config = yaml.safe_load(f)
+                        self.config = yaml.load(f, Loader=YAMLLoader)
                     elif self.config_path.suffix.lower() == '.json':
                         self.config = json.load(f)
                     else:
@@ -21,8 +21,19 @@ from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
 
+try:
+    # libyaml的C实现，比纯Python的SafeLoader快一个数量级
+    from yaml import CSafeLoader as YAMLLoader
+    YAML_CLOADER_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as YAMLLoader
+    YAML_CLOADER_AVAILABLE = False
+
 T = TypeVar('T')
 
+# YAML配置解析结果的JSON缓存文件后缀（与配置文件同目录，如 config.yaml.cache.json）
+YAML_CACHE_SUFFIX = ".cache.json"
+
 
 class ConfigFormat(Enum):
     """配置文件格式枚举"""
@@ -81,6 +92,9 @@ class ConfigManager:
         self.auto_reload = auto_reload
         self.validation_enabled = validation_enabled
         
+        # YAML加载器，优先使用libyaml的C实现
+        self._yaml_loader = YAMLLoader
+        
         # 配置数据
         self.config_data: Dict[str, Any] = {}
         self.config_metadata: Optional[ConfigMetadata] = None
@@ -159,14 +173,14 @@ class ConfigManager:
             # 读取配置文件
             file_format = self._detect_file_format(config_file)
             
-            with open(config_file, 'r', encoding='utf-8') as f:
-                if file_format == ConfigFormat.JSON:
+            if file_format == ConfigFormat.JSON:
+                with open(config_file, 'r', encoding='utf-8') as f:
                     new_config = json.load(f)
-                elif file_format in [ConfigFormat.YAML, ConfigFormat.YAML_ALT]:
-                    new_config = yaml.safe_load(f)
-                else:
-                    self.logger.error(f"不支持的文件格式: {file_format}")
-                    return False
+            elif file_format in [ConfigFormat.YAML, ConfigFormat.YAML_ALT]:
+                new_config = self._load_yaml_with_cache(config_file)
+            else:
+                self.logger.error(f"不支持的文件格式: {file_format}")
+                return False
                     
             # 更新配置数据
             old_config = self.config_data.copy()
@@ -258,6 +272,10 @@ class ConfigManager:
                     self.logger.error(f"不支持的文件格式: {file_format}")
                     return False
                     
+            # 同步刷新缓存，保存后下次启动仍可直接读取缓存
+            if file_format in [ConfigFormat.YAML, ConfigFormat.YAML_ALT]:
+                self._write_yaml_cache(save_path, self.config_data)
+                
             self.logger.info(f"配置文件已保存: {save_path}")
             return True
             
@@ -582,6 +600,86 @@ class ConfigManager:
             # 默认使用YAML格式
             return ConfigFormat.YAML
     
+    def _get_yaml_cache_path(self, config_file: Path) -> Path:
+        """
+        获取YAML配置对应的JSON缓存文件路径（内部方法）
+        
+        Args:
+            config_file: YAML配置文件路径
+            
+        Returns:
+            Path: 缓存文件路径
+        """
+        return config_file.with_name(config_file.name + YAML_CACHE_SUFFIX)
+    
+    def _load_yaml_with_cache(self, config_file: Path) -> Any:
+        """
+        加载YAML配置，优先使用JSON缓存（内部方法）
+        
+        缓存记录了生成时YAML文件的修改时间和大小，两者都一致时直接读取缓存，
+        否则重新解析YAML并更新缓存
+        
+        Args:
+            config_file: YAML配置文件路径
+            
+        Returns:
+            Any: 解析后的配置数据
+        """
+        file_stat = config_file.stat()
+        cache_file = self._get_yaml_cache_path(config_file)
+        
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if (cached.get('source_mtime_ns') == file_stat.st_mtime_ns and
+                    cached.get('source_size') == file_stat.st_size):
+                self.logger.debug(f"使用配置缓存: {cache_file}")
+                return cached['data']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+            
+        with open(config_file, 'r', encoding='utf-8') as f:
+            data = yaml.load(f, Loader=self._yaml_loader)
+            
+        self._write_yaml_cache(config_file, data)
+        return data
+    
+    def _write_yaml_cache(self, config_file: Path, data: Any) -> bool:
+        """
+        将YAML配置的解析结果写入JSON缓存（内部方法）
+        
+        JSON无法原样表示的数据（如日期、非字符串键）不写缓存，
+        避免从缓存读出的配置与YAML解析结果不一致
+        
+        Args:
+            config_file: YAML配置文件路径
+            data: 解析后的配置数据
+            
+        Returns:
+            bool: 写入成功返回True
+        """
+        cache_file = self._get_yaml_cache_path(config_file)
+        try:
+            file_stat = config_file.stat()
+            content = json.dumps({
+                'source_mtime_ns': file_stat.st_mtime_ns,
+                'source_size': file_stat.st_size,
+                'data': data
+            }, ensure_ascii=False)
+            if json.loads(content)['data'] != data:
+                self.logger.debug(f"配置包含JSON无法表示的数据，不写缓存: {config_file}")
+                return False
+                
+            # 先写临时文件再替换，避免并发启动时读到写了一半的缓存
+            temp_file = cache_file.with_name(cache_file.name + '.tmp')
+            temp_file.write_text(content, encoding='utf-8')
+            os.replace(temp_file, cache_file)
+            return True
+            
+        except (TypeError, ValueError, OSError) as e:
+            self.logger.debug(f"写入配置缓存失败: {str(e)}")
+            return False
+    
     def _register_default_validators(self):
         """
         注册默认验证器（内部方法）
@@ -842,6 +940,7 @@ if __name__ == "__main__":
             
         # 清理测试文件
         test_file.unlink()
+        test_file.with_name(test_file.name + YAML_CACHE_SUFFIX).unlink(missing_ok=True)
         print(f"✅ 测试完成")
         
     except Exception as e:
@@ -11,21 +11,289 @@ CSI摄像头模块 - 重构版本
 4. 统一参数顺序和返回值格式
 """
 
+import os
 import threading
 import time
 import logging
-from pathlib import Path
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
 from typing import Optional, Tuple, Callable, Dict, Any, Union
 import numpy as np
 from datetime import datetime
 
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
     PICAMERA2_AVAILABLE = True
 except ImportError:
     PICAMERA2_AVAILABLE = False
     logging.warning("Picamera2库不可用，摄像头功能将受限")
 
+try:
+    # 较新版本的picamera2提供DMA缓冲区分配器，缓冲区由驱动预分配并循环复用
+    from picamera2.allocators import DmaAllocator
+    DMA_ALLOCATOR_AVAILABLE = True
+except ImportError:
+    DMA_ALLOCATOR_AVAILABLE = False
+
+try:
+    # VideoCore硬件MJPEG编码器，编码不占用ARM核心
+    from picamera2.encoders import MJPEGEncoder
+    from picamera2.outputs import FileOutput
+    HW_ENCODER_AVAILABLE = True
+except ImportError:
+    HW_ENCODER_AVAILABLE = False
+
+try:
+    # SIMD优化的JPEG编码，用于保存已捕获的ndarray
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
+try:
+    # JIT编译逐帧处理内核，nogil模式下执行时释放GIL，可与捕获线程真正并行
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# OpenCV仅在simplejpeg不可用或需要YUV转换时使用，首次需要时才导入
+_cv2 = None
+_cv2_import_error: Optional[str] = None
+
+
+def _get_cv2():
+    """
+    获取延迟导入的cv2模块（内部函数）
+    
+    导入只尝试一次：成功后直接返回缓存的模块，失败后记录原因，之后的调用不再重复导入
+    
+    Returns:
+        module: cv2模块
+        
+    Raises:
+        RuntimeError: OpenCV不可用
+    """
+    global _cv2, _cv2_import_error
+    if _cv2 is not None:
+        return _cv2
+    if _cv2_import_error is None:
+        try:
+            import cv2
+            _cv2 = cv2
+            return _cv2
+        except ImportError as e:
+            _cv2_import_error = str(e)
+            logging.warning(f"OpenCV库不可用，无法回退编码图像: {_cv2_import_error}")
+    raise RuntimeError(f"OpenCV库不可用: {_cv2_import_error}")
+
+
+# 默认JPEG质量
+DEFAULT_JPEG_QUALITY = 85
+
+# 默认缓冲区数量：3-10之间可避免掉帧，4在内存占用与抗抖动之间取得平衡
+DEFAULT_BUFFER_COUNT = 4
+
+# 已创建目录缓存的容量（LRU），避免向大量不同目录保存时缓存无限增长
+KNOWN_DIRS_CACHE_SIZE = 128
+
+# 回调分发环的槽位数量，回调落后超过该数量时丢弃最旧的帧
+DEFAULT_CALLBACK_RING_SIZE = 4
+
+# 异步保存的最大排队数量，超过后丢弃新的保存请求，避免慢速存储导致内存无限增长
+DEFAULT_MAX_PENDING_SAVES = 4
+
+# numba内核的编译选项：缓存编译结果避免每次启动重新编译，nogil允许与捕获线程并行
+NUMBA_KERNEL_OPTIONS = {"cache": True, "nogil": True, "fastmath": True}
+
+# 颜色模式与主数据流像素格式的对应关系
+# mono模式使用YUV420输出，仅取Y平面（亮度），数据量为RGB888的1/3
+COLOR_MODE_FORMATS = {
+    "rgb": "RGB888",
+    "yuv420": "YUV420",
+    "mono": "YUV420",
+}
+
+
+# 常用逐帧处理的参考内核，可直接传给CSICamera.register_numba_callback()
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, **NUMBA_KERNEL_OPTIONS)
+    def mean_intensity(frame: np.ndarray) -> float:
+        """计算整帧平均亮度（按行并行累加）"""
+        total = 0.0
+        for i in prange(frame.shape[0]):
+            total += frame[i].sum()
+        return total / frame.size
+
+    @njit(parallel=True, **NUMBA_KERNEL_OPTIONS)
+    def roi_sum(frame: np.ndarray, x: int, y: int, width: int, height: int) -> float:
+        """计算矩形感兴趣区域内的像素和（按行并行累加）"""
+        total = 0.0
+        for i in prange(y, y + height):
+            total += frame[i, x:x + width].sum()
+        return total
+else:
+    def mean_intensity(frame: np.ndarray) -> float:
+        """计算整帧平均亮度（numba不可用时的numpy实现）"""
+        return float(frame.mean())
+
+    def roi_sum(frame: np.ndarray, x: int, y: int, width: int, height: int) -> float:
+        """计算矩形感兴趣区域内的像素和（numba不可用时的numpy实现）"""
+        return float(frame[y:y + height, x:x + width].sum(dtype=np.float64))
+
+
+class SharedFrameRing:
+    """
+    共享内存帧环形缓冲区
+    在进程间传递图像帧，消费者通过名称打开并以ndarray视图直接读取，无需序列化和拷贝
+    
+    内存布局：
+    - 头部(uint64)：[最新序号, 槽位数, 高, 宽, 通道数]，随后每个槽位一组[序号, 时间戳(ns)]
+    - 数据区：ring_size个固定大小的帧槽位，按64字节对齐
+    """
+    
+    _HEADER_FIELDS = 5
+    _ALIGNMENT = 64
+    
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        绑定共享内存块（请使用create()或attach()创建实例）
+        
+        Args:
+            shm: 共享内存块
+            owner: 是否为创建者，创建者负责unlink
+        """
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        
+        fields = np.ndarray((self._HEADER_FIELDS,), dtype=np.uint64, buffer=shm.buf)
+        self.ring_size = int(fields[1])
+        self.shape = (int(fields[2]), int(fields[3]), int(fields[4]))
+        self.slot_size = int(np.prod(self.shape))
+        
+        header_words = self._HEADER_FIELDS + 2 * self.ring_size
+        self._header = np.ndarray((header_words,), dtype=np.uint64, buffer=shm.buf)
+        self._slot_meta = self._header[self._HEADER_FIELDS:].reshape(self.ring_size, 2)
+        
+        data_offset = self._data_offset(self.ring_size)
+        self._slots = [
+            np.ndarray(self.shape, dtype=np.uint8, buffer=shm.buf,
+                       offset=data_offset + i * self.slot_size)
+            for i in range(self.ring_size)
+        ]
+        
+    @classmethod
+    def _data_offset(cls, ring_size: int) -> int:
+        """计算数据区起始偏移（头部大小按对齐边界取整）"""
+        header_bytes = 8 * (cls._HEADER_FIELDS + 2 * ring_size)
+        return (header_bytes + cls._ALIGNMENT - 1) // cls._ALIGNMENT * cls._ALIGNMENT
+    
+    @classmethod
+    def create(cls, name: str, shape: Tuple[int, int, int], ring_size: int = 4) -> 'SharedFrameRing':
+        """
+        创建共享内存环形缓冲区（生产者调用）
+        
+        Args:
+            name: 共享内存名称
+            shape: 帧形状 (高, 宽, 通道数)
+            ring_size: 槽位数量
+            
+        Returns:
+            SharedFrameRing: 环形缓冲区实例
+        """
+        size = cls._data_offset(ring_size) + ring_size * int(np.prod(shape))
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 上次进程异常退出遗留的同名共享内存，清理后重建
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            
+        fields = np.ndarray((cls._HEADER_FIELDS + 2 * ring_size,), dtype=np.uint64, buffer=shm.buf)
+        fields[:] = 0
+        fields[1:cls._HEADER_FIELDS] = (ring_size,) + tuple(shape)
+        del fields
+        return cls(shm, owner=True)
+    
+    @classmethod
+    def attach(cls, name: str) -> 'SharedFrameRing':
+        """
+        按名称打开已存在的环形缓冲区（消费者调用）
+        
+        Args:
+            name: 共享内存名称
+            
+        Returns:
+            SharedFrameRing: 环形缓冲区实例
+        """
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+    
+    def write(self, frame: np.ndarray) -> int:
+        """
+        写入一帧到下一个槽位并发布序号
+        
+        Args:
+            frame: 图像数据，形状必须与缓冲区一致
+            
+        Returns:
+            int: 本帧序号（从1开始递增）
+        """
+        seq = int(self._header[0]) + 1
+        slot = (seq - 1) % self.ring_size
+        np.copyto(self._slots[slot], frame.reshape(self.shape))
+        self._slot_meta[slot, 1] = time.time_ns()
+        self._slot_meta[slot, 0] = seq
+        # 最后更新最新序号，消费者看到序号时槽位数据已写完
+        self._header[0] = seq
+        return seq
+    
+    def read_latest(self) -> Optional[Tuple[np.ndarray, int, int]]:
+        """
+        读取最新一帧的零拷贝视图
+        
+        视图在生产者绕回覆盖该槽位前有效（约ring_size帧），需要长期持有时请自行copy()
+        
+        Returns:
+            Tuple[np.ndarray, int, int]: (帧视图, 序号, 时间戳ns)，尚无数据返回None
+        """
+        seq = int(self._header[0])
+        if seq == 0:
+            return None
+        slot = (seq - 1) % self.ring_size
+        return self._slots[slot], seq, int(self._slot_meta[slot, 1])
+    
+    def is_valid(self, seq: int) -> bool:
+        """
+        检查某序号对应的槽位是否仍未被覆盖
+        
+        Args:
+            seq: read_latest()返回的序号
+            
+        Returns:
+            bool: 槽位数据仍属于该序号返回True
+        """
+        return int(self._slot_meta[(seq - 1) % self.ring_size, 0]) == seq
+    
+    def close(self):
+        """
+        释放本进程中的视图并关闭共享内存，创建者同时unlink
+        
+        调用前需释放read_latest()返回的所有视图，否则共享内存无法关闭
+        """
+        self._slots = []
+        self._slot_meta = None
+        self._header = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
 
 class CSICamera:
     """
@@ -40,16 +308,32 @@ class CSICamera:
     - 摄像头信息管理
     """
     
-    def __init__(self, camera_id: int = 0, resolution: Tuple[int, int] = (1280, 1024)):
+    def __init__(self, camera_id: int = 0, resolution: Tuple[int, int] = (1280, 1024),
+                 buffer_count: int = DEFAULT_BUFFER_COUNT, shm_name: Optional[str] = None,
+                 ring_size: int = 4, color_mode: str = "rgb"):
         """
         初始化CSI摄像头
         
         Args:
             camera_id: 摄像头ID，默认为0
             resolution: 图像分辨率，默认为(1280, 1024)
+            buffer_count: 预分配的帧缓冲区数量，默认为4
+            shm_name: 共享内存帧环名称，为None时不向其他进程发布帧
+            ring_size: 共享内存帧环的槽位数量
+            color_mode: 颜色模式，"rgb"、"yuv420"（原始平面数据）或"mono"（仅亮度平面）
         """
+        if color_mode not in COLOR_MODE_FORMATS:
+            raise ValueError(f"不支持的颜色模式: {color_mode}")
+            
         self.camera_id = camera_id
         self.resolution = resolution
+        self.buffer_count = buffer_count
+        self.shm_name = shm_name
+        self.ring_size = ring_size
+        self.frame_ring: Optional[SharedFrameRing] = None
+        self.color_mode = color_mode
+        self.stride: Optional[int] = None
+        self.capture_mode = "still"
         self.picam2: Optional[Picamera2] = None
         self.is_running = False
         self.is_capturing = False
@@ -59,15 +343,56 @@ class CSICamera:
         self.contrast = 0.5
         self.saturation = 0.5
         self.exposure_time = -1
+        # 调用方显式设置过的参数名；未设置的参数保持libcamera默认值，不下发
+        self._explicit_params: set = set()
         
         # 线程相关
         self.capture_thread: Optional[threading.Thread] = None
-        self.frame_lock = threading.Lock()
+        # latest_frame只做引用替换（CPython下为原子操作），无需逐帧加锁；
+        # 仅在重新配置替换缓冲池时通过事件阻止捕获
+        self._pool_ready = threading.Event()
+        self._pool_ready.set()
         self.latest_frame: Optional[np.ndarray] = None
         self.frame_callback: Optional[Callable[[np.ndarray], None]] = None
         
+        # 回调分发（单生产者/单消费者，回调在独立线程执行，不阻塞捕获）
+        # 待分发和正在回调的帧记录在_callback_held中，归还前暂存槽位不会被复用
+        self.callback_ring_size = DEFAULT_CALLBACK_RING_SIZE
+        self.dispatch_thread: Optional[threading.Thread] = None
+        self._callback_pending: deque = deque()
+        self._callback_held: set = set()
+        self._callback_lock = threading.Lock()
+        self._callback_event = threading.Event()
+        
+        # numba编译的逐帧处理内核：(名称, 内核, 附加参数)，在分发线程中执行，结果按名称保存
+        self._numba_callbacks: list = []
+        self.kernel_results: Dict[str, Any] = {}
+        
+        # 连拍缓冲区（按需分配，多次连拍之间复用）
+        self._burst_buf: Optional[np.ndarray] = None
+        
+        # 单帧捕获的暂存槽位（初始化时预分配，轮转复用）
+        self._scratch: list = []
+        self._scratch_index = 0
+        
+        # JPEG编码
+        self.jpeg_quality = DEFAULT_JPEG_QUALITY
+        self._mjpeg_encoder = None
+        self.is_recording = False
+        
+        # 异步保存（JPEG编码和写盘不阻塞捕获线程）
+        self.max_pending_saves = DEFAULT_MAX_PENDING_SAVES
+        self._save_pool: Optional[ThreadPoolExecutor] = None
+        self._save_lock = threading.Lock()
+        self._pending_saves = 0
+        # 两个保存线程会同时读写目录缓存，move_to_end/popitem需加锁
+        self._known_dirs: "OrderedDict[str, None]" = OrderedDict()
+        self._known_dirs_lock = threading.Lock()
+        
         # 日志
         self.logger = logging.getLogger(f"{__name__}.CSICamera")
+        # 缓存DEBUG级别是否开启，热路径上跳过调试消息的构造；日志配置变更后调用refresh_log_level()
+        self._dbg = self.logger.isEnabledFor(logging.DEBUG)
         
         self.logger.info(f"CSI摄像头初始化完成: camera_id={camera_id}, resolution={resolution}")
     
@@ -84,15 +409,25 @@ class CSICamera:
                 return False
                 
             self.logger.info(f"开始初始化CSI摄像头: {self.camera_id}")
+            self.refresh_log_level()
             
-            # 创建Picamera2实例
-            self.picam2 = Picamera2(camera_num=self.camera_id)
+            # 创建Picamera2实例（可用时使用DMA分配器预分配缓冲池）
+            if DMA_ALLOCATOR_AVAILABLE:
+                self.picam2 = Picamera2(camera_num=self.camera_id, allocator=DmaAllocator())
+            else:
+                self.picam2 = Picamera2(camera_num=self.camera_id)
             
             # 配置摄像头
-            camera_config = self.picam2.create_still_configuration(
-                main={"size": self.resolution, "format": "RGB888"}
-            )
-            self.picam2.configure(camera_config)
+            self.picam2.configure(self._create_configuration(self.capture_mode))
+            self._update_stride()
+            self._allocate_scratch()
+            
+            # 创建共享内存帧环，供其他进程零拷贝读取
+            if self.shm_name:
+                self.frame_ring = SharedFrameRing.create(
+                    self.shm_name, self._frame_shape(), self.ring_size
+                )
+                self.logger.info(f"共享内存帧环已创建: {self.shm_name}, 槽位数={self.ring_size}")
             
             # 启动摄像头
             self.picam2.start()
@@ -109,6 +444,59 @@ class CSICamera:
             self.is_running = False
             return False
     
+    def reconfigure(self, mode: str = "still", buffer_count: Optional[int] = None) -> bool:
+        """
+        重新配置摄像头的流模式和缓冲区数量，无需重建CSICamera实例
+        
+        Args:
+            mode: 配置模式，"still"（静态拍照）或"video"（连续捕获）
+            buffer_count: 缓冲区数量，为None时保持当前值
+            
+        Returns:
+            bool: 重新配置成功返回True
+        """
+        try:
+            if mode not in ("still", "video"):
+                self.logger.error(f"不支持的配置模式: {mode}")
+                return False
+                
+            if buffer_count is not None:
+                if buffer_count < 1:
+                    self.logger.error(f"缓冲区数量无效: {buffer_count}")
+                    return False
+                self.buffer_count = buffer_count
+            self.capture_mode = mode
+            
+            if not self.picam2 or not self.is_running:
+                self.logger.debug("摄像头未运行，配置将在初始化时生效")
+                return True
+                
+            # 连续捕获期间不能切换缓冲池，先暂停捕获线程
+            was_capturing = self.is_capturing
+            callback = self.frame_callback
+            if was_capturing:
+                self.stop_continuous_capture()
+                
+            self.logger.info(f"重新配置摄像头: mode={mode}, buffer_count={self.buffer_count}")
+            self._pool_ready.clear()
+            try:
+                self.picam2.stop()
+                self.picam2.configure(self._create_configuration(mode))
+                self._update_stride()
+                self._allocate_scratch()
+                self.picam2.start()
+            finally:
+                self._pool_ready.set()
+            self._apply_camera_parameters()
+            
+            if was_capturing:
+                self._start_capture_thread(callback)
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"重新配置摄像头失败: {str(e)}")
+            return False
+    
     def release_camera(self) -> bool:
         """
         释放摄像头资源
@@ -119,8 +507,14 @@ class CSICamera:
         try:
             self.logger.info("开始释放CSI摄像头资源")
             
-            # 停止连续捕获
+            # 停止连续捕获和录制
             self.stop_continuous_capture()
+            self.stop_recording()
+            
+            # 等待排队中的保存任务完成
+            if self._save_pool:
+                self._save_pool.shutdown(wait=True)
+                self._save_pool = None
             
             # 停止摄像头
             if self.picam2:
@@ -128,11 +522,15 @@ class CSICamera:
                 self.picam2.close()
                 self.picam2 = None
                 
+            # 释放共享内存帧环
+            if self.frame_ring:
+                self.frame_ring.close()
+                self.frame_ring = None
+                
             # 清理状态
             self.is_running = False
             self.is_capturing = False
-            with self.frame_lock:
-                self.latest_frame = None
+            self.latest_frame = None
                 
             self.logger.info("CSI摄像头资源释放完成")
             return True
@@ -145,6 +543,8 @@ class CSICamera:
         """
         捕获单张图像
         
+        返回的数组来自预分配的暂存槽位，会在若干次捕获之后被覆盖，需要长期持有时请自行copy()
+        
         Args:
             save_path: 保存路径，为None时不保存
             
@@ -156,30 +556,95 @@ class CSICamera:
                 self.logger.error("摄像头未初始化，无法捕获图像")
                 return None
                 
-            self.logger.debug("开始捕获图像")
+            # 缓冲池正在重新配置时等待其完成
+            if not self._pool_ready.is_set() and not self._pool_ready.wait(timeout=5.0):
+                self.logger.error("等待摄像头重新配置超时")
+                return None
+                
+            if self._dbg:
+                self.logger.debug("开始捕获图像")
             
             # 捕获图像
-            frame = self.picam2.capture_array()
+            if self.color_mode == "mono":
+                # capture_buffer()每次返回独立的缓冲区，Y平面视图可以直接持有
+                frame = self._capture_y_plane()
+            else:
+                frame = self._capture_into_scratch()
             
             if frame is None:
                 self.logger.error("图像捕获失败：返回None")
                 return None
                 
-            # 更新最新帧
-            with self.frame_lock:
-                self.latest_frame = frame.copy()
+            # 更新最新帧（引用替换即可，暂存槽位轮转回来之前不会被覆盖）
+            self.latest_frame = frame
+                
+            # 发布到共享内存帧环
+            if self.frame_ring:
+                self.frame_ring.write(frame)
                 
-            # 保存图像（如果指定了路径）
+            # 保存图像（如果指定了路径），在后台线程中编码写盘
+            # 暂存槽位会被后续捕获复用，异步保存需要持有独立拷贝
             if save_path:
-                self.save_image(save_path, frame)
+                self._submit_save(save_path, frame if self.color_mode == "mono" else frame.copy())
                 
-            self.logger.debug(f"图像捕获成功: shape={frame.shape}")
+            if self._dbg:
+                self.logger.debug("图像捕获成功: shape=%s", frame.shape)
             return frame
             
         except Exception as e:
             self.logger.error(f"图像捕获失败: {str(e)}")
             return None
     
+    def capture_burst(self, n: int) -> Optional[np.ndarray]:
+        """
+        连续捕获n帧到预分配的缓冲区
+        
+        每帧通过capture_request()直接从DMA缓冲区拷贝到预分配的槽位，N帧只需一次分配。
+        返回的数组在下一次capture_burst()时会被覆盖，需要长期持有时请自行copy()
+        
+        Args:
+            n: 帧数
+            
+        Returns:
+            np.ndarray: 形状为(n, 高, 宽[, 通道])的帧数组，失败返回None
+        """
+        try:
+            if not self.is_running or not self.picam2:
+                self.logger.error("摄像头未初始化，无法连拍")
+                return None
+                
+            if n < 1:
+                self.logger.error(f"连拍帧数无效: {n}")
+                return None
+                
+            shape = self._frame_shape()
+            if shape[2] == 1:
+                shape = shape[:2]
+            if self._burst_buf is None or self._burst_buf.shape[0] < n or self._burst_buf.shape[1:] != shape:
+                self._burst_buf = np.empty((n,) + shape, dtype=np.uint8)
+            frames = self._burst_buf[:n]
+            
+            width, height = self.resolution
+            for i in range(n):
+                request = self.picam2.capture_request()
+                try:
+                    with MappedArray(request, "main") as mapped:
+                        if self.color_mode == "mono":
+                            np.copyto(frames[i], mapped.array[:height, :width])
+                        else:
+                            np.copyto(frames[i], mapped.array.reshape(shape))
+                finally:
+                    request.release()
+                    
+            self.latest_frame = frames[n - 1].copy()
+            
+            self.logger.debug("连拍完成: %d帧", n)
+            return frames
+            
+        except Exception as e:
+            self.logger.error(f"连拍失败: {str(e)}")
+            return None
+    
     def start_continuous_capture(self, callback: Optional[Callable[[np.ndarray], None]] = None) -> bool:
         """
         开始连续图像捕获
@@ -201,14 +666,11 @@ class CSICamera:
                 
             self.logger.info("开始连续图像捕获")
             
-            # 设置回调函数
-            self.frame_callback = callback
-            self.is_capturing = True
-            
-            # 启动捕获线程
-            self.capture_thread = threading.Thread(target=self._capture_loop, name="CameraCapture")
-            self.capture_thread.daemon = True
-            self.capture_thread.start()
+            # 连续捕获使用视频配置，多缓冲区可吸收消费者抖动
+            if self.capture_mode != "video" and not self.reconfigure("video"):
+                return False
+                
+            self._start_capture_thread(callback)
             
             self.logger.info("连续图像捕获已启动")
             return True
@@ -239,6 +701,11 @@ class CSICamera:
             if self.capture_thread and self.capture_thread.is_alive():
                 self.capture_thread.join(timeout=5.0)
                 
+            # 唤醒分发线程，处理完剩余帧后退出
+            self._callback_event.set()
+            if self.dispatch_thread and self.dispatch_thread.is_alive():
+                self.dispatch_thread.join(timeout=5.0)
+                
             self.logger.info("连续图像捕获已停止")
             return True
             
@@ -252,7 +719,7 @@ class CSICamera:
         
         Args:
             file_path: 文件保存路径
-            image: 图像数据，为None时使用最新帧
+            image: 图像数据，为None时使用最新帧；两者都没有时由picamera2拍摄一张
             
         Returns:
             bool: 保存成功返回True
@@ -262,38 +729,159 @@ class CSICamera:
             if image is None:
                 image = self.get_latest_frame()
                 
-            if image is None:
+            if image is None and not (self.picam2 and self.is_running):
                 self.logger.error("没有可保存的图像")
                 return False
                 
             # 确保目录存在
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_parent_dir(file_path)
             
-            # 保存图像
-            if self.picam2:
-                # 使用picamera2直接保存
+            # 保存图像：已有图像时直接编码，不再触发新的传感器捕获
+            if image is None:
                 self.picam2.capture_file(file_path)
+            elif self.color_mode == "yuv420":
+                # 平面YUV420数据需先去掉行跨度填充、转换为BGR再编码
+                cv2 = _get_cv2()
+                cv2.imwrite(file_path, cv2.cvtColor(self._pack_yuv420(image), cv2.COLOR_YUV420p2BGR))
             else:
-                # 备用方案：使用OpenCV保存
-                import cv2
-                cv2.imwrite(file_path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+                self._write_jpeg(file_path, image)
                 
             self.logger.info(f"图像已保存: {file_path}")
             return True
             
         except Exception as e:
+            # 目录可能已被外部删除，下次保存时重新创建
+            with self._known_dirs_lock:
+                self._known_dirs.pop(os.path.dirname(file_path), None)
             self.logger.error(f"保存图像失败: {str(e)}")
             return False
     
-    def get_latest_frame(self) -> Optional[np.ndarray]:
+    def start_recording(self, file_path: str) -> bool:
+        """
+        开始MJPEG录制，由VideoCore硬件编码器完成JPEG编码
+        
+        Args:
+            file_path: MJPEG输出文件路径
+            
+        Returns:
+            bool: 启动成功返回True
+        """
+        try:
+            if not HW_ENCODER_AVAILABLE:
+                self.logger.error("硬件编码器不可用，无法录制")
+                return False
+                
+            if not self.is_running or not self.picam2:
+                self.logger.error("摄像头未初始化，无法录制")
+                return False
+                
+            if self.is_recording:
+                self.logger.warning("录制已在运行")
+                return True
+                
+            # 硬件编码器需要视频配置
+            if self.capture_mode != "video" and not self.reconfigure("video"):
+                return False
+                
+            if self._mjpeg_encoder is None:
+                self._mjpeg_encoder = MJPEGEncoder()
+                
+            self._ensure_parent_dir(file_path)
+            self.picam2.start_encoder(self._mjpeg_encoder, FileOutput(file_path))
+            self.is_recording = True
+            
+            self.logger.info(f"MJPEG录制已启动: {file_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"启动录制失败: {str(e)}")
+            return False
+    
+    def stop_recording(self) -> bool:
+        """
+        停止MJPEG录制
+        
+        Returns:
+            bool: 停止成功返回True
+        """
+        try:
+            if not self.is_recording:
+                return True
+                
+            self.picam2.stop_encoder(self._mjpeg_encoder)
+            self.is_recording = False
+            
+            self.logger.info("MJPEG录制已停止")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"停止录制失败: {str(e)}")
+            return False
+    
+    def get_latest_frame(self, copy: bool = False) -> Optional[np.ndarray]:
         """
         获取最新捕获的图像帧
         
+        默认返回只读视图，不做拷贝。视图仅在下一次capture_image()或捕获循环迭代之前有效，
+        需要修改图像或长期持有时请传入copy=True
+        
+        Args:
+            copy: 为True时返回可写的独立拷贝
+            
         Returns:
             np.ndarray: 最新图像帧，无则返回None
         """
-        with self.frame_lock:
-            return self.latest_frame.copy() if self.latest_frame is not None else None
+        frame = self.latest_frame
+        if frame is None:
+            return None
+        if copy:
+            return frame.copy()
+        view = frame.view()
+        view.flags.writeable = False
+        return view
+    
+    def refresh_log_level(self):
+        """
+        重新读取日志级别
+        
+        捕获路径缓存了DEBUG级别是否开启，运行中修改日志配置后调用本方法使其生效
+        """
+        self._dbg = self.logger.isEnabledFor(logging.DEBUG)
+    
+    def register_numba_callback(self, fn: Callable, *args, name: Optional[str] = None) -> bool:
+        """
+        注册逐帧处理内核，在分发线程中对每一帧执行
+        
+        numba可用时以nogil模式编译，执行期间释放GIL，CPU密集的处理不再与捕获线程串行；
+        已经用@njit装饰过的函数直接使用。需在start_continuous_capture()之前注册
+        
+        Args:
+            fn: 处理函数，签名为fn(frame, *args)
+            *args: 每次调用时附加的参数（如ROI坐标）
+            name: 结果名称，默认使用函数名
+            
+        Returns:
+            bool: 注册成功返回True
+        """
+        try:
+            if self.is_capturing:
+                self.logger.error("连续捕获运行中，无法注册处理内核")
+                return False
+                
+            kernel = fn
+            if NUMBA_AVAILABLE and not hasattr(fn, "py_func"):
+                kernel = njit(**NUMBA_KERNEL_OPTIONS)(fn)
+            elif not NUMBA_AVAILABLE:
+                self.logger.warning("numba库不可用，处理内核将以纯Python方式执行")
+                
+            name = name or getattr(fn, "__name__", "kernel")
+            self._numba_callbacks.append((name, kernel, args))
+            self.logger.info(f"已注册处理内核: {name}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"注册处理内核失败: {str(e)}")
+            return False
     
     def set_camera_parameters(self, brightness: Optional[float] = None, 
                             contrast: Optional[float] = None,
@@ -315,12 +903,16 @@ class CSICamera:
             # 更新参数值
             if brightness is not None:
                 self.brightness = max(0.0, min(1.0, brightness))
+                self._explicit_params.add('brightness')
             if contrast is not None:
                 self.contrast = max(0.0, min(2.0, contrast))
+                self._explicit_params.add('contrast')
             if saturation is not None:
                 self.saturation = max(0.0, min(2.0, saturation))
+                self._explicit_params.add('saturation')
             if exposure_time is not None:
                 self.exposure_time = exposure_time
+                self._explicit_params.add('exposure_time')
                 
             # 应用参数到硬件
             return self._apply_camera_parameters()
@@ -340,8 +932,12 @@ class CSICamera:
             info = {
                 'camera_id': self.camera_id,
                 'resolution': self.resolution,
+                'capture_mode': self.capture_mode,
+                'color_mode': self.color_mode,
+                'buffer_count': self.buffer_count,
                 'is_running': self.is_running,
                 'is_capturing': self.is_capturing,
+                'is_recording': self.is_recording,
                 'brightness': self.brightness,
                 'contrast': self.contrast,
                 'saturation': self.saturation,
@@ -367,6 +963,222 @@ class CSICamera:
             self.logger.error(f"获取摄像头信息失败: {str(e)}")
             return {'error': str(e)}
     
+    def _create_configuration(self, mode: str) -> Dict[str, Any]:
+        """
+        创建指定模式的摄像头配置（内部方法）
+        
+        Args:
+            mode: 配置模式，"still"或"video"
+            
+        Returns:
+            Dict[str, Any]: Picamera2配置
+        """
+        main_stream = {"size": self.resolution, "format": COLOR_MODE_FORMATS[self.color_mode]}
+        if mode == "video":
+            return self.picam2.create_video_configuration(
+                main=main_stream, buffer_count=self.buffer_count
+            )
+        return self.picam2.create_still_configuration(
+            main=main_stream, buffer_count=self.buffer_count
+        )
+    
+    def _submit_save(self, file_path: str, image: np.ndarray) -> bool:
+        """
+        提交异步保存任务（内部方法）
+        
+        Args:
+            file_path: 文件保存路径
+            image: 图像数据，提交后调用方不得再修改
+            
+        Returns:
+            bool: 已提交返回True，排队已满被丢弃返回False
+        """
+        with self._save_lock:
+            if self._pending_saves >= self.max_pending_saves:
+                self.logger.warning(f"保存队列已满({self._pending_saves})，丢弃图像: {file_path}")
+                return False
+            self._pending_saves += 1
+            if self._save_pool is None:
+                self._save_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="CamSave")
+            save_pool = self._save_pool
+            
+        future = save_pool.submit(self.save_image, file_path, image)
+        future.add_done_callback(self._on_save_done)
+        return True
+    
+    def _on_save_done(self, future: Future):
+        """异步保存任务完成回调（内部方法）"""
+        with self._save_lock:
+            self._pending_saves -= 1
+    
+    def _ensure_parent_dir(self, file_path: str):
+        """
+        确保文件的父目录存在（内部方法）
+        
+        已创建过的目录记录在LRU缓存中，连续保存到同一目录时不再产生stat/mkdir系统调用
+        
+        Args:
+            file_path: 文件路径
+        """
+        parent = os.path.dirname(file_path)
+        if not parent:
+            return
+        with self._known_dirs_lock:
+            if parent in self._known_dirs:
+                self._known_dirs.move_to_end(parent)
+                return
+        # mkdir在锁外执行，exist_ok保证两个线程同时创建同一目录也不会出错
+        os.makedirs(parent, exist_ok=True)
+        with self._known_dirs_lock:
+            self._known_dirs[parent] = None
+            if len(self._known_dirs) > KNOWN_DIRS_CACHE_SIZE:
+                self._known_dirs.popitem(last=False)
+    
+    def _write_jpeg(self, file_path: str, image: np.ndarray):
+        """
+        将已捕获的图像编码为JPEG并写入文件（内部方法）
+        
+        优先使用simplejpeg（SIMD编码，无需颜色转换），不可用时回退到OpenCV
+        
+        Picamera2的"RGB888"格式在内存中按B,G,R排列，与OpenCV一致，两种编码路径都直接按BGR处理
+        
+        Args:
+            file_path: 文件保存路径
+            image: 摄像头内存布局的BGR图像或单通道亮度图
+        """
+        if SIMPLEJPEG_AVAILABLE:
+            if image.ndim == 2:
+                data = simplejpeg.encode_jpeg(
+                    np.ascontiguousarray(image)[..., np.newaxis], self.jpeg_quality, 'GRAY'
+                )
+            else:
+                data = simplejpeg.encode_jpeg(
+                    np.ascontiguousarray(image), self.jpeg_quality, 'BGR'
+                )
+            with open(file_path, 'wb') as f:
+                f.write(data)
+            return
+            
+        cv2 = _get_cv2()
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        cv2.imwrite(file_path, image, params)
+    
+    def _update_stride(self):
+        """读取主数据流的行跨度（内部方法），YUV格式的行宽可能大于图像宽度"""
+        if self.color_mode == "rgb":
+            self.stride = None
+            return
+        self.stride = self.picam2.stream_configuration("main")["stride"]
+    
+    def _pack_yuv420(self, image: np.ndarray) -> np.ndarray:
+        """
+        去掉YUV420帧的行跨度填充，得到紧凑的I420数据（内部方法）
+        
+        Y平面每行stride字节，U/V平面每行stride/2字节；stride大于宽度时直接做颜色转换会导致图像错位
+        
+        Args:
+            image: capture_image()返回的(高*3/2, stride)平面数据
+            
+        Returns:
+            np.ndarray: (高*3/2, 宽)的I420数据，无填充时原样返回
+        """
+        width, height = self.resolution
+        stride = image.shape[1]
+        if stride == width:
+            return image
+        half_stride, half_width, half_height = stride // 2, width // 2, height // 2
+        plane_size = half_height * half_stride
+        chroma = image[height:].reshape(-1)
+        u = chroma[:plane_size].reshape(half_height, half_stride)[:, :half_width]
+        v = chroma[plane_size:2 * plane_size].reshape(half_height, half_stride)[:, :half_width]
+        
+        packed = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        packed[:height] = image[:height, :width]
+        packed_chroma = packed[height:].reshape(-1)
+        packed_chroma[:half_height * half_width] = u.reshape(-1)
+        packed_chroma[half_height * half_width:] = v.reshape(-1)
+        return packed
+    
+    def _frame_shape(self) -> Tuple[int, int, int]:
+        """
+        获取capture_image()返回帧的形状（内部方法）
+        
+        Returns:
+            Tuple[int, int, int]: (高, 宽, 通道数)，单平面数据的通道数为1
+        """
+        width, height = self.resolution
+        if self.color_mode == "mono":
+            return (height, width, 1)
+        if self.color_mode == "yuv420":
+            return (height * 3 // 2, self.stride, 1)
+        return (height, width, 3)
+    
+    def _allocate_scratch(self):
+        """
+        按当前帧形状预分配单帧捕获的暂存槽位（内部方法）
+        
+        槽位数比回调环多2个：待分发的帧最多占callback_ring_size个、正在回调的帧占1个，
+        捕获时跳过这些槽位后至少还剩1个空闲槽位
+        """
+        if self.color_mode == "mono":
+            self._scratch = []
+            return
+        shape = self._frame_shape()
+        if shape[2] == 1:
+            shape = shape[:2]
+        count = self.callback_ring_size + 2
+        if len(self._scratch) != count or self._scratch[0].shape != shape:
+            self._scratch = [np.empty(shape, dtype=np.uint8) for _ in range(count)]
+            self._scratch_index = 0
+    
+    def _capture_into_scratch(self) -> np.ndarray:
+        """
+        捕获一帧并从DMA缓冲区直接拷贝到下一个暂存槽位（内部方法）
+        
+        替代capture_array()+copy()，每帧不再分配新数组
+        
+        Returns:
+            np.ndarray: 暂存槽位中的帧数据
+        """
+        if not self._scratch:
+            self._allocate_scratch()
+        # 跳过仍被回调分发持有的槽位，避免覆盖回调正在读取的帧
+        scratch = self._scratch
+        count = len(scratch)
+        with self._callback_lock:
+            held = self._callback_held
+            index = self._scratch_index
+            for _ in range(count):
+                frame = scratch[index]
+                index = (index + 1) % count
+                if id(frame) not in held:
+                    break
+            self._scratch_index = index
+        
+        request = self.picam2.capture_request()
+        try:
+            with MappedArray(request, "main") as mapped:
+                np.copyto(frame, mapped.array)
+        finally:
+            request.release()
+        return frame
+    
+    def _capture_y_plane(self) -> Optional[np.ndarray]:
+        """
+        捕获一帧并返回Y平面的跨步视图（内部方法）
+        
+        YUV420的第一个平面即亮度，按stride重塑后截取有效宽度，不做任何颜色转换或拷贝
+        
+        Returns:
+            np.ndarray: 形状为(高, 宽)的uint8亮度图，失败返回None
+        """
+        buffer = self.picam2.capture_buffer("main")
+        if buffer is None:
+            return None
+        width, height = self.resolution
+        plane = np.frombuffer(buffer, dtype=np.uint8, count=height * self.stride)
+        return plane.reshape(height, self.stride)[:, :width]
+    
     def _apply_camera_parameters(self) -> bool:
         """
         应用摄像头参数到硬件（内部方法）
@@ -375,19 +1187,63 @@ class CSICamera:
             bool: 应用成功返回True
         """
         try:
-            if not self.picam2 or not self.is_running:
-                self.logger.debug("摄像头未运行，跳过参数应用")
+            if not self.picam2:
+                self.logger.debug("摄像头未初始化，跳过参数应用")
                 return True
                 
-            # Note: Picamera2的参数设置需要在配置阶段完成
-            # 这里可以添加具体的参数设置逻辑
-            self.logger.debug(f"应用摄像头参数: brightness={self.brightness}, contrast={self.contrast}")
+            # 只下发调用方显式设置过的参数，合并为一次set_controls调用，
+            # 运行中即时生效，无需重新配置
+            controls = {}
+            if 'brightness' in self._explicit_params:
+                # 本模块亮度范围为0.0-1.0（0.5为默认），libcamera为-1.0-1.0（0为默认）
+                controls["Brightness"] = float(self.brightness) * 2.0 - 1.0
+            if 'contrast' in self._explicit_params:
+                # 对比度和饱和度与libcamera同为0.0-2.0（1.0为默认），直接下发
+                controls["Contrast"] = float(self.contrast)
+            if 'saturation' in self._explicit_params:
+                controls["Saturation"] = float(self.saturation)
+            if 'exposure_time' in self._explicit_params:
+                if self.exposure_time == -1:
+                    controls["AeEnable"] = True
+                else:
+                    controls["AeEnable"] = False
+                    controls["ExposureTime"] = int(self.exposure_time)
+                    
+            if not controls:
+                return True
+                
+            self.picam2.set_controls(controls)
+            self.logger.debug("应用摄像头参数: %s", controls)
             return True
             
         except Exception as e:
             self.logger.error(f"应用摄像头参数失败: {str(e)}")
             return False
     
+    def _start_capture_thread(self, callback: Optional[Callable[[np.ndarray], None]]):
+        """
+        设置回调并启动捕获线程（内部方法）
+        
+        Args:
+            callback: 帧回调函数
+        """
+        self.frame_callback = callback
+        self.refresh_log_level()
+        self.is_capturing = True
+        
+        with self._callback_lock:
+            self._callback_pending.clear()
+            self._callback_held.clear()
+        self._callback_event.clear()
+        if callback or self._numba_callbacks:
+            self.dispatch_thread = threading.Thread(target=self._dispatch_loop, name="CameraDispatch")
+            self.dispatch_thread.daemon = True
+            self.dispatch_thread.start()
+        
+        self.capture_thread = threading.Thread(target=self._capture_loop, name="CameraCapture")
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+    
     def _capture_loop(self):
         """
         连续捕获循环（内部线程方法）
@@ -395,32 +1251,94 @@ class CSICamera:
         self.logger.info("捕获循环线程已启动")
         capture_count = 0
         
+        # 热路径上的属性查找绑定为局部变量；回调在线程启动前设置，循环期间不变
+        capture = self.capture_image
+        has_callback = self.frame_callback is not None or bool(self._numba_callbacks)
+        pending = self._callback_pending
+        held = self._callback_held
+        lock = self._callback_lock
+        ring_size = self.callback_ring_size
+        signal = self._callback_event.set
+        dropped = 0
+        sleep = time.sleep
+        log_debug = self.logger.debug
+        log_error = self.logger.error
+        debug_on = self._dbg
+        
         while self.is_capturing:
             try:
                 # 捕获图像
-                frame = self.capture_image()
+                frame = capture()
                 
                 if frame is not None:
                     capture_count += 1
                     
-                    # 调用回调函数
-                    if self.frame_callback:
-                        try:
-                            self.frame_callback(frame)
-                        except Exception as e:
-                            self.logger.error(f"帧回调函数错误: {str(e)}")
+                    # 交给分发线程：标记为持有并入队，唤醒消费者
+                    # 持有的暂存槽位在分发线程归还前不会被捕获复用，因此无需拷贝
+                    if has_callback:
+                        with lock:
+                            # 回调落后超过环容量时丢弃最旧的待分发帧，释放其槽位
+                            if len(pending) >= ring_size:
+                                held.discard(id(pending.popleft()))
+                                dropped += 1
+                            pending.append(frame)
+                            held.add(id(frame))
+                        signal()
                             
-                    self.logger.debug(f"捕获循环: 第{capture_count}帧, shape={frame.shape}")
+                    if debug_on:
+                        log_debug("捕获循环: 第%d帧, shape=%s", capture_count, frame.shape)
                     
                 # 控制捕获频率（约30fps）
-                time.sleep(0.033)
+                sleep(0.033)
                 
             except Exception as e:
-                self.logger.error(f"捕获循环错误: {str(e)}")
-                time.sleep(1.0)  # 错误时降低频率
+                log_error(f"捕获循环错误: {str(e)}")
+                sleep(1.0)  # 错误时降低频率
                 
+        if dropped:
+            self.logger.warning(f"回调处理过慢，共丢弃{dropped}帧")
         self.logger.info(f"捕获循环线程已停止，共捕获{capture_count}帧")
     
+    def _dispatch_loop(self):
+        """
+        回调分发循环（内部线程方法）
+        
+        单消费者：出队和归还槽位都在锁内完成，帧处理完毕后才允许捕获线程复用其槽位
+        """
+        callback = self.frame_callback
+        kernels = list(self._numba_callbacks)
+        results = self.kernel_results
+        pending = self._callback_pending
+        held = self._callback_held
+        lock = self._callback_lock
+        event = self._callback_event
+        
+        while True:
+            # 先清除事件再检查队列，入队后的唤醒不会丢失
+            event.clear()
+            with lock:
+                frame = pending.popleft() if pending else None
+            if frame is None:
+                if not self.is_capturing:
+                    break
+                event.wait(timeout=0.5)
+                continue
+                
+            try:
+                for name, kernel, args in kernels:
+                    try:
+                        results[name] = kernel(frame, *args)
+                    except Exception as e:
+                        self.logger.error(f"处理内核{name}错误: {str(e)}")
+                if callback is not None:
+                    try:
+                        callback(frame)
+                    except Exception as e:
+                        self.logger.error(f"帧回调函数错误: {str(e)}")
+            finally:
+                with lock:
+                    held.discard(id(frame))
+    
     # 上下文管理器支持
     def __enter__(self):
         """
@@ -565,14 +1483,20 @@ class CSICameraManager:
         try:
             self.logger.info("开始释放所有摄像头资源")
             
-            success_count = 0
-            for name, camera in list(self.cameras.items()):
-                if camera.release_camera():
-                    success_count += 1
-                    
+            cameras = list(self.cameras.values())
+            total = len(cameras)
+            if total == 0:
+                return True
+            
+            # 并行释放：每个picam2.stop()都要等待DMA缓冲区回收，串行释放耗时随摄像头数量线性增长
+            with ThreadPoolExecutor(max_workers=total,
+                                    thread_name_prefix="camera-release") as executor:
+                results = list(executor.map(lambda camera: camera.release_camera(), cameras))
+            
+            success_count = sum(1 for result in results if result)
             self.cameras.clear()
-            self.logger.info(f"所有摄像头资源已释放 ({success_count}/{len(self.cameras)})")
-            return success_count == len(self.cameras)
+            self.logger.info(f"所有摄像头资源已释放 ({success_count}/{total})")
+            return success_count == total
             
         except Exception as e:
             self.logger.error(f"释放所有摄像头资源失败: {str(e)}")
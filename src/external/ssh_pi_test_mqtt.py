@@ -6,6 +6,8 @@ MQTT module referenced from ssh pi test project
 
 import json
 import logging
+import queue
+import sys
 import threading
 import time
 from datetime import datetime
@@ -18,6 +20,121 @@ except ImportError:
     MQTT_AVAILABLE = False
     print("警告: paho-mqtt 库未安装，MQTT功能不可用")
 
+try:
+    # orjson 为C实现，编解码速度是标准库的数倍，且直接输出UTF-8字节，paho无需再次编码
+    import orjson
+    ORJSON_AVAILABLE = True
+
+    def _dumps(obj: Any) -> bytes:
+        # 分拣结果中常含numpy标量（标准库json可直接序列化float64），需显式开启numpy支持
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    _loads = orjson.loads
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+try:
+    # CBOR：二进制编码，分拣结果体积约为JSON的一半
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# 分拣结果可选的序列化格式；二进制格式发布到带格式后缀的子主题（如 pi_sorter/results/cbor）
+RESULT_ENCODERS: Dict[str, Callable[[Any], bytes]] = {'json': _dumps}
+RESULT_DECODERS: Dict[str, Callable[[bytes], Any]] = {'json': _loads}
+if CBOR_AVAILABLE:
+    RESULT_ENCODERS['cbor'] = cbor2.dumps
+    RESULT_DECODERS['cbor'] = cbor2.loads
+if MSGPACK_AVAILABLE:
+    RESULT_ENCODERS['msgpack'] = msgpack.packb
+    RESULT_DECODERS['msgpack'] = msgpack.unpackb
+
+
+def decode_payload(topic: str, payload: bytes) -> Any:
+    """
+    按主题后缀解码分拣结果（供订阅方使用）
+    
+    二进制格式的结果发布在 pi_sorter/results/cbor 等子主题上，只订阅 pi_sorter/results
+    的订阅方（如 temp/check_status_results.py）收不到；需要时请订阅 pi_sorter/results/#
+    并用本函数解码
+    
+    Args:
+        topic: 主题，以 /cbor 或 /msgpack 结尾时按对应格式解码，否则按JSON解码
+        payload: 原始消息字节
+        
+    Returns:
+        Any: 解码后的数据
+    """
+    decoder = RESULT_DECODERS.get(topic.rpartition('/')[2], _loads)
+    return decoder(payload)
+
+# 批量发布：攒够一批或等待超过时限即发送，摊薄每条消息的锁与系统调用开销
+FLUSH_BATCH_SIZE = 64
+FLUSH_INTERVAL = 0.005
+TX_QUEUE_SIZE = 1000
+
+# 断线期间发送线程每次等待重连的时间（秒）
+RECONNECT_WAIT = 1.0
+
+# 接收队列容量：paho网络线程只负责入队，解析与回调在独立线程中执行
+RX_QUEUE_SIZE = 10000
+
+# 断线重连的退避范围（秒），由paho网络循环按指数退避自动重连
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+# QoS>0 的在途窗口与离线排队上限：默认在途窗口仅20条，批量发布时容易阻塞
+MAX_INFLIGHT_MESSAGES = 100
+MAX_QUEUED_MESSAGES = 10000
+MESSAGE_RETRY_INTERVAL = 5
+
+# 已交给paho但尚未发出（未触发 on_publish）的消息上限，代理缓慢或断线时拒绝新消息，避免内存无限增长
+DEFAULT_MAX_PENDING_PUBLISHES = 1000
+
+# 在途消息达到上限时，发送线程暂停的时间（秒）
+BACKPRESSURE_WAIT = 0.01
+
+# SorterMQTTManager 使用的主题及其默认值
+_TOPIC_KEYS = ('status', 'results', 'commands', 'images', 'alerts', 'statistics', 'heartbeat')
+_DEFAULT_TOPICS = {k: f'pi_sorter/{k}' for k in _TOPIC_KEYS}
+
+# 通知发送线程退出的哨兵
+_FLUSH_STOP = object()
+
+# 时间戳缓存：(毫秒键, ISO字符串)，整体替换保证读到的键值始终匹配
+_iso_cache = (-1, "")
+
+
+def _iso_now() -> str:
+    """
+    获取当前时间的ISO格式字符串
+    
+    以 monotonic_ns() >> 20（约1毫秒）为键缓存结果，高频发布时同一毫秒内不再重复格式化
+    
+    Returns:
+        str: ISO格式时间戳
+    """
+    global _iso_cache
+    key = time.monotonic_ns() >> 20
+    cached_key, cached_value = _iso_cache
+    if key == cached_key:
+        return cached_value
+    value = datetime.now().isoformat()
+    _iso_cache = (key, value)
+    return value
+
 
 class MQTTClient:
     """
@@ -26,7 +143,8 @@ class MQTTClient:
     """
     
     def __init__(self, broker_host: str = "localhost", broker_port: int = 1883,
-                 client_id: str = None, username: str = None, password: str = None):
+                 client_id: str = None, username: str = None, password: str = None,
+                 unthreaded: bool = False, max_inflight: int = DEFAULT_MAX_PENDING_PUBLISHES):
         """
         初始化MQTT客户端
         
@@ -36,6 +154,8 @@ class MQTTClient:
             client_id: 客户端ID
             username: 用户名
             password: 密码
+            unthreaded: 为True时不启动paho网络线程，由宿主程序在主循环中调用pump()驱动网络收发
+            max_inflight: 尚未发出的消息上限，超过后 publish 直接返回False
         """
         if not MQTT_AVAILABLE:
             raise ImportError("paho-mqtt 库未安装，无法使用MQTT功能")
@@ -46,26 +166,30 @@ class MQTTClient:
         self.username = username
         self.password = password
         
-        # 创建MQTT客户端，兼容 paho-mqtt 2.x 的 callback_api_version
-        try:
+        # 创建MQTT客户端：paho-mqtt 2.x 需显式声明回调API版本，回调签名沿用 v1
+        if hasattr(mqtt, 'CallbackAPIVersion'):
             self.client = mqtt.Client(
+                callback_api_version=mqtt.CallbackAPIVersion.VERSION1,
                 client_id=self.client_id,
                 protocol=mqtt.MQTTv311,
-                transport="tcp",
-                callback_api_version=getattr(mqtt, 'CallbackAPIVersion', None).VERSION1
-                if hasattr(getattr(mqtt, 'CallbackAPIVersion', None), 'VERSION1') else None
+                transport="tcp"
+            )
+        else:
+            self.client = mqtt.Client(
+                client_id=self.client_id,
+                protocol=mqtt.MQTTv311,
+                transport="tcp"
             )
-        except TypeError:
-            # 旧版本不支持 callback_api_version 关键字
-            self.client = mqtt.Client(self.client_id)
         
         # 设置认证
         if self.username and self.password:
             self.client.username_pw_set(self.username, self.password)
         
-        # 连接状态
+        # 连接状态：单个布尔值的读写本身是原子的，无需加锁；需要等待时使用事件
         self.is_connected = False
-        self.connection_lock = threading.Lock()
+        # on_connect 成功时置位，connect() 直接等待该事件，无需轮询
+        self._last_connect_rc = None
+        self._connected_event = threading.Event()
         
         # 消息回调
         self.message_callbacks = {}
@@ -74,6 +198,13 @@ class MQTTClient:
         # 日志
         self.logger = logging.getLogger(__name__)
         
+        # 接收队列与处理线程：避免JSON解析和用户回调阻塞paho的网络线程
+        self._rx_queue = queue.Queue(maxsize=RX_QUEUE_SIZE)
+        self._rx_dropped = 0
+        self._rx_thread = threading.Thread(target=self._rx_worker, name="MQTTReceive")
+        self._rx_thread.daemon = True
+        self._rx_thread.start()
+        
         # 设置MQTT回调
         # 绑定回调（兼容 v1 API）
         self.client.on_connect = self._on_connect
@@ -82,96 +213,123 @@ class MQTTClient:
         self.client.on_publish = self._on_publish
         self.client.on_subscribe = self._on_subscribe
         
-        # 重连设置
+        # 重连设置：loop_start() 的网络线程在意外断开后自动重连，无需额外的重连线程
         self.auto_reconnect = True
-        self.reconnect_delay = 5
-        self.max_reconnect_attempts = 10
-        self.reconnect_thread = None
+        self.client.reconnect_delay_set(min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY)
+        
+        # 队列与重发设置
+        self.client.max_inflight_messages_set(MAX_INFLIGHT_MESSAGES)
+        self.client.max_queued_messages_set(MAX_QUEUED_MESSAGES)
+        if hasattr(self.client, 'message_retry_set'):
+            # paho-mqtt 2.x 已移除该接口（重发改为仅在重连时进行）
+            self.client.message_retry_set(MESSAGE_RETRY_INTERVAL)
+        
+        # 网络循环线程只启动一次，重复调用 connect() 不会叠加线程
+        self._loop_started = False
+        
+        # 发布背压：统计已交给paho但尚未发出的消息数量
+        self.max_inflight = max_inflight
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self._last_backpressure_log = 0.0
+        
+        # 单线程模式：网络收发与重连都由 pump() 驱动
+        self.unthreaded = unthreaded
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._next_reconnect = 0.0
     
     def _on_connect(self, client, userdata, flags, rc, properties=None):
         """连接回调"""
-        # 记录最近一次 rc
-        try:
-            self._last_connect_rc = rc
-        except Exception:
-            pass
+        # 记录最近一次 rc（先于事件置位写入，等待方被唤醒时一定能读到）
+        self._last_connect_rc = rc
         if rc == 0:
-            with self.connection_lock:
-                self.is_connected = True
-            self.logger.info(f"MQTT连接成功: {self.broker_host}:{self.broker_port}")
+            # 重连后paho的发送队列已重建，重新开始计数
+            with self._inflight_lock:
+                self._inflight = 0
+            self.is_connected = True
+            self._connected_event.set()
+            self.logger.info("MQTT连接成功: %s:%s", self.broker_host, self.broker_port)
         else:
-            self.logger.error(f"MQTT连接失败，错误码: {rc}")
+            self.logger.error("MQTT连接失败，错误码: %s", rc)
 
     def _on_disconnect(self, client, userdata, rc, properties=None):
         """断开连接回调"""
-        with self.connection_lock:
-            self.is_connected = False
+        self.is_connected = False
+        self._connected_event.clear()
         
         if rc != 0:
-            self.logger.warning(f"MQTT意外断开连接，错误码: {rc}")
+            self.logger.warning("MQTT意外断开连接，错误码: %s", rc)
             if self.auto_reconnect:
-                self._start_reconnect()
+                self.logger.info("MQTT网络循环将自动重连")
+            else:
+                # 停止网络循环，阻止paho自动重连
+                self.client.loop_stop()
+                self._loop_started = False
         else:
             self.logger.info("MQTT正常断开连接")
     
     def _on_message(self, client, userdata, msg):
-        """消息接收回调"""
-        try:
-            topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-            
-            self.logger.debug(f"收到MQTT消息: {topic} -> {payload}")
-            
-            # 尝试解析JSON
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                data = payload
-            
-            # 调用对应的回调函数
-            if topic in self.message_callbacks:
-                self.message_callbacks[topic](topic, data)
-            elif self.default_callback:
-                self.default_callback(topic, data)
-            
-        except Exception as e:
-            self.logger.error(f"处理MQTT消息时发生错误: {str(e)}")
-    
-    def _on_publish(self, client, userdata, mid):
-        """发布消息回调"""
-        self.logger.debug(f"MQTT消息发布成功，消息ID: {mid}")
+        """消息接收回调（运行在paho网络线程中，只做入队；未按主题路由的消息走这里）"""
+        self._put_rx((msg.topic, msg.payload, None))
     
-    def _on_subscribe(self, client, userdata, mid, granted_qos):
-        """订阅回调"""
-        self.logger.debug(f"MQTT订阅成功，消息ID: {mid}, QoS: {granted_qos}")
-    
-    def _start_reconnect(self):
-        """开始重连"""
-        if self.reconnect_thread and self.reconnect_thread.is_alive():
-            return
+    def _put_rx(self, item: tuple):
+        """
+        将收到的消息放入接收队列
         
-        self.reconnect_thread = threading.Thread(target=self._reconnect_loop)
-        self.reconnect_thread.daemon = True
-        self.reconnect_thread.start()
+        Args:
+            item: (topic, payload, callback)，callback为None时由处理线程按主题查找
+        """
+        try:
+            self._rx_queue.put_nowait(item)
+        except queue.Full:
+            # 队列已满时丢弃最旧的消息，保证最新的命令能被处理
+            try:
+                self._rx_queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._rx_queue.put_nowait(item)
+            except queue.Full:
+                pass
+            self._rx_dropped += 1
+            if self._rx_dropped % 1000 == 1:
+                self.logger.warning("MQTT接收队列已满，已丢弃%d条旧消息", self._rx_dropped)
     
-    def _reconnect_loop(self):
-        """重连循环"""
-        attempts = 0
+    def _rx_worker(self):
+        """接收处理循环：解析消息并分发到回调函数"""
+        rx_queue = self._rx_queue
         
-        while not self.is_connected and attempts < self.max_reconnect_attempts:
+        while True:
+            topic, payload, callback = rx_queue.get()
             try:
-                attempts += 1
-                self.logger.info(f"尝试重连MQTT ({attempts}/{self.max_reconnect_attempts})...")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("收到MQTT消息: %s -> %s", topic, payload)
                 
-                self.client.reconnect()
-                time.sleep(self.reconnect_delay)
+                # 按主题后缀选择解码器（JSON/CBOR/msgpack），直接解析原始字节
+                try:
+                    data = decode_payload(topic, payload)
+                except Exception:
+                    # 既非结构化数据也可能不是合法UTF-8，按文本尽量还原
+                    data = payload.decode('utf-8', errors='replace')
+                
+                # 调用对应的回调函数（已按主题路由的消息自带回调，其余一次查表，未注册的主题交给默认回调）
+                if callback is None:
+                    callback = self.message_callbacks.get(topic) or self.default_callback
+                if callback is not None:
+                    callback(topic, data)
                 
             except Exception as e:
-                self.logger.error(f"MQTT重连失败: {str(e)}")
-                time.sleep(self.reconnect_delay)
-        
-        if not self.is_connected:
-            self.logger.error("MQTT重连失败，已达到最大尝试次数")
+                self.logger.error("处理MQTT消息时发生错误: %s", e)
+    
+    def _on_publish(self, client, userdata, mid):
+        """发布消息回调"""
+        self.release_inflight()
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("MQTT消息发布成功，消息ID: %s", mid)
+    
+    def _on_subscribe(self, client, userdata, mid, granted_qos):
+        """订阅回调"""
+        self.logger.debug("MQTT订阅成功，消息ID: %s, QoS: %s", mid, granted_qos)
     
     def connect(self, keepalive: int = 60) -> bool:
         """
@@ -185,49 +343,97 @@ class MQTTClient:
         """
         try:
             self.logger.info(
-                f"连接MQTT代理: host={self.broker_host}:{self.broker_port}, "
-                f"client_id={self.client_id}, username={'SET' if self.username else 'NONE'}"
+                "连接MQTT代理: host=%s:%s, client_id=%s, username=%s",
+                self.broker_host, self.broker_port, self.client_id,
+                'SET' if self.username else 'NONE'
             )
             
+            # 先清除状态再发起连接，避免回调早于等待触发时被覆盖
+            self._last_connect_rc = None
+            self._connected_event.clear()
+            
             # 兼容 paho-mqtt 1.x 与 2.x：不依赖 connect 的返回值，统一通过 on_connect 设置连接状态
             # 在 2.x 中，connect 返回值语义发生变化，因此直接启动网络循环并等待回调标记
             self.client.connect(self.broker_host, self.broker_port, keepalive)
             
-            # 启动网络循环
-            self.client.loop_start()
-
-            # 等待连接完成（由 on_connect 回调置位）
+            # 等待连接完成（由 on_connect 回调置位，回调到达即刻唤醒）
             timeout = 10
-            start_time = time.time()
-            self._last_connect_rc = None
             self.logger.debug("等待 on_connect 回调以确认连接...")
-            while not self.is_connected and (time.time() - start_time) < timeout:
-                time.sleep(0.1)
-
-            if self.is_connected:
+            
+            if self.unthreaded:
+                # 单线程模式下由本线程驱动网络循环，直到收到 CONNACK
+                deadline = time.monotonic() + timeout
+                while not self._connected_event.is_set() and time.monotonic() < deadline:
+                    self.client.loop(0.1)
+                connected = self._connected_event.is_set()
+            else:
+                # 启动网络循环
+                if not self._loop_started:
+                    self.client.loop_start()
+                    self._loop_started = True
+                connected = self._connected_event.wait(timeout)
+            
+            if connected:
                 return True
             else:
-                self.logger.error(f"MQTT连接超时或失败，last_rc={self._last_connect_rc}")
+                self.logger.error("MQTT连接超时或失败，last_rc=%s", self._last_connect_rc)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"MQTT连接时发生错误: {str(e)}")
+            self.logger.error("MQTT连接时发生错误: %s", e)
             return False
     
     def disconnect(self):
         """断开MQTT连接"""
         try:
             self.auto_reconnect = False
-            self.client.loop_stop()
+            # 先发送DISCONNECT再停止网络循环，主动断开后paho不会重连
             self.client.disconnect()
+            if self.unthreaded:
+                # 没有网络线程，手动驱动一次循环把DISCONNECT发送出去
+                self.client.loop(0.1)
+            elif self._loop_started:
+                self.client.loop_stop()
+                self._loop_started = False
             
-            with self.connection_lock:
-                self.is_connected = False
+            self.is_connected = False
+            self._connected_event.clear()
             
             self.logger.info("MQTT连接已断开")
             
         except Exception as e:
-            self.logger.error(f"断开MQTT连接时发生错误: {str(e)}")
+            self.logger.error("断开MQTT连接时发生错误: %s", e)
+    
+    def pump(self, timeout: float = 0.005) -> bool:
+        """
+        驱动一次网络循环（仅用于单线程模式）
+        
+        宿主程序在主循环的每次迭代（如两帧之间）调用，处理收发、保活与断线重连，
+        省去paho网络线程与应用线程之间的GIL争用
+        
+        Args:
+            timeout: 等待网络事件的最长时间(秒)
+            
+        Returns:
+            bool: 当前是否处于连接状态
+        """
+        if not self.unthreaded:
+            return self.is_connected
+        
+        rc = self.client.loop(timeout)
+        if rc == mqtt.MQTT_ERR_SUCCESS:
+            return self.is_connected
+        
+        # loop() 不会自动重连，按指数退避自行重连
+        if self.auto_reconnect and time.monotonic() >= self._next_reconnect:
+            try:
+                self.client.reconnect()
+                self._reconnect_delay = RECONNECT_MIN_DELAY
+            except Exception as e:
+                self.logger.warning("MQTT重连失败，%d秒后重试: %s", self._reconnect_delay, e)
+                self._next_reconnect = time.monotonic() + self._reconnect_delay
+                self._reconnect_delay = min(self._reconnect_delay * 2, RECONNECT_MAX_DELAY)
+        return False
     
     def publish(self, topic: str, payload: Any, qos: int = 0, retain: bool = False) -> bool:
         """
@@ -246,26 +452,91 @@ class MQTTClient:
             self.logger.error("MQTT未连接，无法发布消息")
             return False
         
+        if not self.reserve_inflight():
+            return False
+        
         try:
-            # 转换为JSON字符串
+            # 转换为JSON（UTF-8字节）
             if isinstance(payload, (dict, list)):
-                payload = json.dumps(payload, ensure_ascii=False)
+                payload = _dumps(payload)
             elif not isinstance(payload, str):
                 payload = str(payload)
             
             result = self.client.publish(topic, payload, qos, retain)
             
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                self.logger.debug(f"MQTT消息发布: {topic} -> {payload}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("MQTT消息发布: %s -> %s", topic, payload)
+                return True
+            else:
+                self.release_inflight()
+                self.logger.error("MQTT消息发布失败，错误码: %s", result.rc)
+                return False
+                
+        except Exception as e:
+            self.release_inflight()
+            self.logger.error("发布MQTT消息时发生错误: %s", e)
+            return False
+    
+    def publish_json(self, topic: str, obj: Any, qos: int = 0, retain: bool = False) -> bool:
+        """
+        发布JSON消息（调用方已确定内容为字典或列表，省去类型判断）
+        
+        Args:
+            topic: 主题
+            obj: 可序列化为JSON的对象
+            qos: 服务质量等级
+            retain: 是否保留消息
+            
+        Returns:
+            bool: 发布是否成功
+        """
+        if not self.is_connected:
+            self.logger.error("MQTT未连接，无法发布消息")
+            return False
+        
+        if not self.reserve_inflight():
+            return False
+        
+        try:
+            result = self.client.publish(topic, _dumps(obj), qos, retain)
+            
+            if result.rc == mqtt.MQTT_ERR_SUCCESS:
                 return True
             else:
-                self.logger.error(f"MQTT消息发布失败，错误码: {result.rc}")
+                self.release_inflight()
+                self.logger.error("MQTT消息发布失败，错误码: %s", result.rc)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"发布MQTT消息时发生错误: {str(e)}")
+            self.release_inflight()
+            self.logger.error("发布MQTT消息时发生错误: %s", e)
             return False
     
+    def reserve_inflight(self) -> bool:
+        """
+        占用一个在途消息名额（发布前调用，发布失败时需调用 release_inflight 归还）
+        
+        Returns:
+            bool: 未达到上限返回True；达到上限返回False，警告每秒最多记录一次
+        """
+        with self._inflight_lock:
+            if self._inflight < self.max_inflight:
+                self._inflight += 1
+                return True
+        
+        now = time.monotonic()
+        if now - self._last_backpressure_log >= 1.0:
+            self._last_backpressure_log = now
+            self.logger.warning("MQTT在途消息达到上限(%d)，暂停发布新消息", self.max_inflight)
+        return False
+    
+    def release_inflight(self):
+        """归还一个在途消息名额（消息已发出或发布失败）"""
+        with self._inflight_lock:
+            if self._inflight > 0:
+                self._inflight -= 1
+    
     def subscribe(self, topic: str, callback: Callable[[str, Any], None] = None, qos: int = 0) -> bool:
         """
         订阅主题
@@ -287,16 +558,17 @@ class MQTTClient:
             
             if result[0] == mqtt.MQTT_ERR_SUCCESS:
                 if callback:
-                    self.message_callbacks[topic] = callback
+                    # 驻留主题字符串，查表时可走指针相等的快速路径
+                    self.message_callbacks[sys.intern(topic)] = callback
                 
-                self.logger.info(f"MQTT主题订阅成功: {topic}")
+                self.logger.info("MQTT主题订阅成功: %s", topic)
                 return True
             else:
-                self.logger.error(f"MQTT主题订阅失败，错误码: {result[0]}")
+                self.logger.error("MQTT主题订阅失败，错误码: %s", result[0])
                 return False
                 
         except Exception as e:
-            self.logger.error(f"订阅MQTT主题时发生错误: {str(e)}")
+            self.logger.error("订阅MQTT主题时发生错误: %s", e)
             return False
     
     def unsubscribe(self, topic: str) -> bool:
@@ -321,16 +593,31 @@ class MQTTClient:
                 if topic in self.message_callbacks:
                     del self.message_callbacks[topic]
                 
-                self.logger.info(f"MQTT主题取消订阅成功: {topic}")
+                self.logger.info("MQTT主题取消订阅成功: %s", topic)
                 return True
             else:
-                self.logger.error(f"MQTT主题取消订阅失败，错误码: {result[0]}")
+                self.logger.error("MQTT主题取消订阅失败，错误码: %s", result[0])
                 return False
                 
         except Exception as e:
-            self.logger.error(f"取消订阅MQTT主题时发生错误: {str(e)}")
+            self.logger.error("取消订阅MQTT主题时发生错误: %s", e)
             return False
     
+    def route_topic(self, topic: str, callback: Callable[[str, Any], None]):
+        """
+        由paho按主题直接路由消息到回调，绕过通用的 on_message 分发
+        
+        消息仍经接收队列在处理线程中解析，不占用paho网络线程
+        
+        Args:
+            topic: 主题（可含通配符）
+            callback: 消息回调函数
+        """
+        def _on_routed_message(client, userdata, msg):
+            self._put_rx((msg.topic, msg.payload, callback))
+        
+        self.client.message_callback_add(topic, _on_routed_message)
+    
     def set_default_callback(self, callback: Callable[[str, Any], None]):
         """
         设置默认消息回调函数
@@ -340,6 +627,18 @@ class MQTTClient:
         """
         self.default_callback = callback
     
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待连接建立（含自动重连）
+        
+        Args:
+            timeout: 超时时间(秒)，None表示一直等待
+            
+        Returns:
+            bool: 超时前是否已连接
+        """
+        return self._connected_event.wait(timeout)
+    
     def is_alive(self) -> bool:
         """
         检查连接是否活跃
@@ -368,17 +667,23 @@ class SorterMQTTManager:
         self.logger = logging.getLogger(__name__)
         
         # 主题配置（优先读取 mqtt.topics，其次读取顶层 topics），统一为 pi_sorter/*
-        mqtt_topics = config.get('mqtt', {}).get('topics', {})
-        top_topics = config.get('topics', {})
-        self.topics = {
-            'status': mqtt_topics.get('status') or top_topics.get('status') or 'pi_sorter/status',
-            'results': mqtt_topics.get('results') or top_topics.get('results') or 'pi_sorter/results',
-            'commands': mqtt_topics.get('commands') or top_topics.get('commands') or 'pi_sorter/commands',
-            'images': mqtt_topics.get('images') or top_topics.get('images') or 'pi_sorter/images',
-            'alerts': mqtt_topics.get('alerts') or top_topics.get('alerts') or 'pi_sorter/alerts',
-            'statistics': mqtt_topics.get('statistics') or top_topics.get('statistics') or 'pi_sorter/statistics',
-            'heartbeat': mqtt_topics.get('heartbeat') or top_topics.get('heartbeat') or 'pi_sorter/heartbeat'
-        }
+        # 合并时过滤空值，保持"空字符串视为未配置"的语义
+        merged = {k: v for k, v in config.get('topics', {}).items() if v}
+        merged.update({k: v for k, v in config.get('mqtt', {}).get('topics', {}).items() if v})
+        self.topics = {k: merged.get(k) or _DEFAULT_TOPICS[k] for k in _TOPIC_KEYS}
+        
+        # 分拣结果的序列化格式（状态与警报需人工查看，始终使用JSON）
+        serializer = (config.get('mqtt', {}).get('serializer')
+                      or config.get('settings', {}).get('serializer') or 'json')
+        if serializer not in RESULT_ENCODERS:
+            self.logger.warning("分拣结果序列化格式不可用: %s，改用json", serializer)
+            serializer = 'json'
+        self.serializer = serializer
+        self._encode_result = RESULT_ENCODERS[serializer]
+        if serializer == 'json':
+            self.results_topic = self.topics['results']
+        else:
+            self.results_topic = f"{self.topics['results']}/{serializer}"
         
         # 状态信息
         self.device_status = {
@@ -387,6 +692,18 @@ class SorterMQTTManager:
             'camera_status': 'unknown',
             'last_update': None
         }
+        
+        # 命令分发表
+        self._cmd_table = {
+            'start_sorting': self._handle_start_sorting,
+            'stop_sorting': self._handle_stop_sorting,
+            'get_status': self._handle_get_status,
+            'capture_image': self._handle_capture_image
+        }
+        
+        # 发送队列与批量发送线程（连接成功后启动）
+        self._tx_queue = queue.Queue(maxsize=TX_QUEUE_SIZE)
+        self._flush_thread = None
     
     def initialize(self) -> bool:
         """
@@ -414,7 +731,8 @@ class SorterMQTTManager:
                 broker_port=client_config['port'],
                 client_id=client_config['client_id'],
                 username=client_config['username'],
-                password=client_config['password']
+                password=client_config['password'],
+                unthreaded=mqtt_config.get('unthreaded', False)
             )
             
             # 设置命令回调
@@ -423,9 +741,13 @@ class SorterMQTTManager:
             # 连接MQTT
             # 传入 keepalive（默认 60）
             if self.client.connect(keepalive=mqtt_config.get('keepalive', 60)):
-                # 订阅命令主题
+                # 订阅命令主题，命令消息由paho直接路由到命令处理函数
+                self.client.route_topic(self.topics['commands'], self._handle_command)
                 self.client.subscribe(self.topics['commands'], self._handle_command)
                 
+                # 启动批量发送线程
+                self._start_flush_thread()
+                
                 # 发布上线状态
                 self._publish_status('online', True)
                 
@@ -436,8 +758,159 @@ class SorterMQTTManager:
                 return False
                 
         except Exception as e:
-            self.logger.error(f"MQTT管理器初始化失败: {str(e)}")
+            self.logger.error("MQTT管理器初始化失败: %s", e)
+            return False
+    
+    def pump(self, timeout: float = 0.005) -> bool:
+        """
+        驱动一次MQTT网络循环（配置 mqtt.unthreaded 为True时，由宿主程序在主循环中调用）
+        
+        Args:
+            timeout: 等待网络事件的最长时间(秒)
+            
+        Returns:
+            bool: 当前是否处于连接状态
+        """
+        if not self.client:
             return False
+        return self.client.pump(timeout)
+    
+    def _start_flush_thread(self):
+        """启动批量发送线程"""
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+        
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="MQTTFlush")
+        self._flush_thread.daemon = True
+        self._flush_thread.start()
+    
+    def _stop_flush_thread(self, timeout: float = 2.0):
+        """停止批量发送线程，队列中剩余的消息发送完毕后退出"""
+        if not self._flush_thread or not self._flush_thread.is_alive():
+            return
+        
+        try:
+            self._tx_queue.put(_FLUSH_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.warning("发送队列已满，无法通知发送线程退出")
+            return
+        self._flush_thread.join(timeout)
+        self._flush_thread = None
+    
+    def _enqueue(self, topic: str, payload: Dict[str, Any], qos: int = 0, retain: bool = False,
+                 encode: Callable[[Any], bytes] = _dumps) -> bool:
+        """
+        将消息放入发送队列
+        
+        Args:
+            topic: 主题
+            payload: 消息内容（字典，发送时编码）
+            qos: 服务质量等级
+            retain: 是否保留消息
+            encode: 编码函数，默认编码为JSON
+            
+        Returns:
+            bool: 是否已入队（发送线程未运行时直接发布）
+        """
+        if not self._flush_thread:
+            if not self.client.is_alive():
+                return False
+            if encode is _dumps:
+                return self.client.publish_json(topic, payload, qos, retain)
+            return self.publish_raw_message(topic, encode(payload), qos, retain)
+        
+        try:
+            self._tx_queue.put_nowait((topic, payload, qos, retain, encode))
+            return True
+        except queue.Full:
+            self.logger.warning("MQTT发送队列已满，丢弃消息: %s", topic)
+            return False
+    
+    def _flush_loop(self):
+        """批量发送循环：取到第一条消息后，在时限内继续收集，凑成一批再集中发送"""
+        tx_queue = self._tx_queue
+        running = True
+        
+        while running:
+            item = tx_queue.get()
+            batch = []
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            
+            while True:
+                if item is _FLUSH_STOP:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= FLUSH_BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = tx_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                # 收到退出通知后不再回填，未连接时剩余消息直接丢弃
+                self._publish_batch(batch, requeue=running)
+    
+    def _publish_batch(self, batch: list, requeue: bool = True):
+        """
+        集中发布一批消息
+        
+        连接状态每批只检查一次；未连接时将消息放回队列，等待重连后再发送
+        
+        Args:
+            batch: (topic, payload, qos, retain, encode) 列表
+            requeue: 未连接时是否放回队列
+        """
+        client = self.client
+        if not client:
+            return
+        
+        if not client.is_alive():
+            if requeue:
+                self._requeue(batch)
+                client.wait_connected(RECONNECT_WAIT)
+            else:
+                self.logger.warning("MQTT未连接，丢弃%d条待发送消息", len(batch))
+            return
+        
+        publish = client.client.publish
+        for index, (topic, payload, qos, retain, encode) in enumerate(batch):
+            if not client.reserve_inflight():
+                # 在途消息过多：剩余消息放回队列，稍后随代理的确认节奏继续发送
+                if requeue:
+                    self._requeue(batch[index:])
+                    time.sleep(BACKPRESSURE_WAIT)
+                else:
+                    self.logger.warning("MQTT在途消息过多，丢弃%d条待发送消息", len(batch) - index)
+                return
+            try:
+                result = publish(topic, encode(payload), qos, retain)
+                if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                    client.release_inflight()
+                    self.logger.error("MQTT消息发布失败: %s，错误码: %s", topic, result.rc)
+            except Exception as e:
+                client.release_inflight()
+                self.logger.error("批量发布MQTT消息时发生错误: %s", e)
+    
+    def _requeue(self, batch: list):
+        """
+        将未发送的消息放回发送队列，队列已满时丢弃
+        
+        Args:
+            batch: (topic, payload, qos, retain, encode) 列表
+        """
+        dropped = 0
+        for item in batch:
+            try:
+                self._tx_queue.put_nowait(item)
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            self.logger.warning("MQTT发送队列已满，丢弃%d条待发送消息", dropped)
     
     def _handle_command(self, topic: str, data: Any):
         """
@@ -453,22 +926,17 @@ class SorterMQTTManager:
                     command = data.get('command')
                     params = data.get('params', {})
                     
-                    self.logger.info(f"收到命令: {command}, 参数: {params}")
+                    self.logger.info("收到命令: %s, 参数: %s", command, params)
                     
                     # 处理不同命令
-                    if command == 'start_sorting':
-                        self._handle_start_sorting(params)
-                    elif command == 'stop_sorting':
-                        self._handle_stop_sorting(params)
-                    elif command == 'get_status':
-                        self._handle_get_status(params)
-                    elif command == 'capture_image':
-                        self._handle_capture_image(params)
+                    handler = self._cmd_table.get(command)
+                    if handler is not None:
+                        handler(params)
                     else:
-                        self.logger.warning(f"未知命令: {command}")
+                        self.logger.warning("未知命令: %s", command)
                 
         except Exception as e:
-            self.logger.error(f"处理命令时发生错误: {str(e)}")
+            self.logger.error("处理命令时发生错误: %s", e)
     
     def _handle_start_sorting(self, params: Dict[str, Any]):
         """处理开始分拣命令"""
@@ -502,17 +970,18 @@ class SorterMQTTManager:
         Returns:
             bool: 发布是否成功
         """
-        if not self.client or not self.client.is_alive():
+        # 连接状态由发送线程按批检查，断线期间消息暂存在队列中
+        if not self.client:
             return False
         
         try:
             # 添加时间戳
-            result['timestamp'] = datetime.now().isoformat()
+            result['timestamp'] = _iso_now()
             
-            return self.client.publish(self.topics['results'], result)
+            return self._enqueue(self.results_topic, result, encode=self._encode_result)
             
         except Exception as e:
-            self.logger.error(f"发布分拣结果失败: {str(e)}")
+            self.logger.error("发布分拣结果失败: %s", e)
             return False
     
     def publish_alert(self, alert_type: str, message: str, level: str = 'info') -> bool:
@@ -527,7 +996,7 @@ class SorterMQTTManager:
         Returns:
             bool: 发布是否成功
         """
-        if not self.client or not self.client.is_alive():
+        if not self.client:
             return False
         
         try:
@@ -535,13 +1004,13 @@ class SorterMQTTManager:
                 'type': alert_type,
                 'message': message,
                 'level': level,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _iso_now()
             }
             
-            return self.client.publish(self.topics['alerts'], alert_data)
+            return self._enqueue(self.topics['alerts'], alert_data)
             
         except Exception as e:
-            self.logger.error(f"发布警报失败: {str(e)}")
+            self.logger.error("发布警报失败: %s", e)
             return False
     
     def _publish_status(self, key: str, value: Any) -> bool:
@@ -555,35 +1024,37 @@ class SorterMQTTManager:
         Returns:
             bool: 发布是否成功
         """
-        if not self.client or not self.client.is_alive():
+        if not self.client:
             return False
         
         try:
+            ts = _iso_now()
             self.device_status[key] = value
-            self.device_status['last_update'] = datetime.now().isoformat()
+            self.device_status['last_update'] = ts
             
             status_data = {
                 key: value,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': ts
             }
             
-            return self.client.publish(self.topics['status'], status_data)
+            return self._enqueue(self.topics['status'], status_data)
             
         except Exception as e:
-            self.logger.error(f"发布状态失败: {str(e)}")
+            self.logger.error("发布状态失败: %s", e)
             return False
     
     def _publish_device_status(self) -> bool:
         """发布完整设备状态"""
-        if not self.client or not self.client.is_alive():
+        if not self.client:
             return False
         
         try:
-            self.device_status['last_update'] = datetime.now().isoformat()
-            return self.client.publish(self.topics['status'], self.device_status)
+            self.device_status['last_update'] = _iso_now()
+            # 发送前状态仍可能被修改，入队快照
+            return self._enqueue(self.topics['status'], dict(self.device_status))
             
         except Exception as e:
-            self.logger.error(f"发布设备状态失败: {str(e)}")
+            self.logger.error("发布设备状态失败: %s", e)
             return False
     
     def publish_message(self, topic: str, message: Any, qos: int = 0, retain: bool = False) -> bool:
@@ -607,7 +1078,7 @@ class SorterMQTTManager:
             return self.client.publish(topic, message, qos, retain)
             
         except Exception as e:
-            self.logger.error(f"发布消息失败: {str(e)}")
+            self.logger.error("发布消息失败: %s", e)
             return False
 
     def publish_raw_message(self, topic: str, payload: bytes, qos: int = 1, retain: bool = False) -> bool:
@@ -627,6 +1098,9 @@ class SorterMQTTManager:
             self.logger.error("MQTT客户端未连接")
             return False
         
+        if not self.client.reserve_inflight():
+            return False
+        
         try:
             # 直接调用paho-mqtt的原始publish方法，避免字符串转换
             result = self.client.client.publish(topic, payload, qos, retain)
@@ -635,31 +1109,24 @@ class SorterMQTTManager:
             if isinstance(result, tuple):
                 # 如果返回的是元组 (result_code, message_id)
                 result_code, _ = result
-                if result_code == mqtt.MQTT_ERR_SUCCESS:
-                    self.logger.debug(f"MQTT二进制消息发布成功: {topic} (大小: {len(payload)}字节)")
-                    return True
-                else:
-                    self.logger.error(f"MQTT二进制消息发布失败，错误码: {result_code}")
-                    return False
             elif hasattr(result, 'rc'):
                 # 如果返回的是结果对象
-                if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                    self.logger.debug(f"MQTT二进制消息发布成功: {topic} (大小: {len(payload)}字节)")
-                    return True
-                else:
-                    self.logger.error(f"MQTT二进制消息发布失败，错误码: {result.rc}")
-                    return False
+                result_code = result.rc
             else:
                 # 如果返回的是简单的布尔值或其他
-                if result:
-                    self.logger.debug(f"MQTT二进制消息发布成功: {topic} (大小: {len(payload)}字节)")
-                    return True
-                else:
-                    self.logger.error(f"MQTT二进制消息发布失败")
-                    return False
+                result_code = mqtt.MQTT_ERR_SUCCESS if result else None
+            
+            if result_code == mqtt.MQTT_ERR_SUCCESS:
+                self.logger.debug("MQTT二进制消息发布成功: %s (大小: %d字节)", topic, len(payload))
+                return True
+            else:
+                self.client.release_inflight()
+                self.logger.error("MQTT二进制消息发布失败，错误码: %s", result_code)
+                return False
                 
         except Exception as e:
-            self.logger.error(f"发布二进制消息失败: {str(e)}")
+            self.client.release_inflight()
+            self.logger.error("发布二进制消息失败: %s", e)
             return False
     
     def shutdown(self):
@@ -669,13 +1136,16 @@ class SorterMQTTManager:
                 # 发布离线状态
                 self._publish_status('online', False)
                 
+                # 发送队列中剩余的消息后停止发送线程
+                self._stop_flush_thread()
+                
                 # 断开连接
                 self.client.disconnect()
                 
             self.logger.info("MQTT管理器已关闭")
             
         except Exception as e:
-            self.logger.error(f"关闭MQTT管理器时发生错误: {str(e)}")
+            self.logger.error("关闭MQTT管理器时发生错误: %s", e)
 
 
 # 使用示例
@@ -3,8 +3,21 @@ from unittest.mock import Mock, patch, MagicMock, call
 import threading
 import time
 import json
+import logging
+import operator as _op
+import os
+import queue
+import numpy as np
 import psutil
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # 导入重构后的模块
 import sys
@@ -15,19 +28,151 @@ from picamera2_module_refactored import CSICameraManager
 from mqtt_manager_refactored import SorterMQTTManager
 from encoder_module_refactored import EncoderManager
 
+# 两次读取CPU使用率的最小间隔（秒），间隔过短时psutil的差值计算不可靠，直接返回上次的值
+CPU_PERCENT_MIN_INTERVAL = 0.5
+
+# 磁盘使用率和进程数变化缓慢，每隔若干次采集才重新读取一次
+SLOW_METRICS_EVERY = 10
+
+# 树莓派CPU温度的sysfs节点（单位：毫摄氏度）
+THERMAL_ZONE_PATH = '/sys/class/thermal/thermal_zone0/temp'
+
+# 网络接口统计（所有接口的收发字节数），直接读取代替psutil.net_io_counters()
+NET_DEV_PATH = '/proc/net/dev'
+
+# 停止监控时等待监控线程退出的时间（秒）；循环在停止事件上等待，置位后立即返回
+STOP_JOIN_TIMEOUT = 0.2
+
+# 空闲降频：无通知渠道、无告警规则且超过该时间（秒）无人读取状态时，
+# 每 IDLE_POLL_FACTOR 个周期才采集一次；一旦有人读取状态，下一个周期即恢复
+IDLE_OBSERVE_TIMEOUT = 60.0
+IDLE_POLL_FACTOR = 6
+
+# 告警通知队列：监控线程只负责入队，由独立线程按批调用通知渠道
+NOTIFY_QUEUE_SIZE = 256
+NOTIFY_BATCH_SIZE = 32      # 单批最多通知数
+NOTIFY_FLUSH_INTERVAL = 0.05  # 批次收集的最长等待时间（秒）
+
+# 健康检查结果的缓存有效期（秒），期间重复调用直接返回上次结果
+HEALTH_CHECK_TTL = 5.0
+
+# 通知线程退出标记
+_NOTIFY_STOP = object()
+
+# 历史记录的结构化行类型（SoA环形缓冲），字段顺序与导出列顺序一致
+_HIST_DTYPE = np.dtype([
+    ('cpu_percent', 'f8'),
+    ('memory_percent', 'f8'),
+    ('disk_usage', 'f8'),
+    ('temperature', 'f8'),
+    ('network_bytes_sent', 'u8'),
+    ('network_bytes_recv', 'u8'),
+    ('process_count', 'u4'),
+    ('thread_count', 'u4'),
+    ('timestamp', 'f8'),
+])
+_HIST_METRICS = _HIST_DTYPE.names[:-1]
+
+
+def _read_net_dev(fd: int):
+    """
+    从已打开的 /proc/net/dev 读取所有接口的收发字节总数
+    
+    Returns:
+        tuple: (接收字节数, 发送字节数)
+    """
+    chunks = []
+    offset = 0
+    while True:
+        chunk = os.pread(fd, 65536, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+        
+    bytes_recv = bytes_sent = 0
+    # 前两行为表头；每行格式为 "iface: 接收8列 发送8列"
+    for line in b''.join(chunks).splitlines()[2:]:
+        fields = line.partition(b':')[2].split()
+        bytes_recv += int(fields[0])
+        bytes_sent += int(fields[8])
+    return bytes_recv, bytes_sent
+
+
+def _json_default(obj):
+    """序列化只读视图等非内置类型"""
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    return str(obj)
+
+
+def _dumps_status(status: Dict[str, Any]) -> bytes:
+    """将状态字典序列化为JSON字节串，可用时使用orjson"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(status, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(status, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+# 告警比较运算符 -> C实现的比较函数，添加规则时解析一次
+_OPS = {
+    '>': _op.gt,
+    '<': _op.lt,
+    '>=': _op.ge,
+    '<=': _op.le,
+    '==': _op.eq,
+    '!=': _op.ne,
+}
+
+
+@dataclass
+class AlertRule:
+    """预解析的告警规则（槽位类，属性按固定偏移访问）"""
+    __slots__ = ('name', 'metric', 'threshold', 'operator', 'severity', 'compare', 'mask')
+    
+    name: str
+    metric: str
+    threshold: float
+    operator: str
+    severity: str
+    compare: Callable[[Any, Any], bool]
+    mask: int  # 告警状态位
+
 
 class SystemMonitor:
     """系统监控器 - 增强版本"""
     
+    logger = logging.getLogger(f"{__name__}.SystemMonitor")
+    
     def __init__(self, config_manager: ConfigManager):
         """初始化系统监控器"""
         self.config_manager = config_manager
         self.is_monitoring = False
         self.monitoring_thread = None
+        # 停止事件：stop时立即唤醒监控循环，无需等待本轮间隔结束
+        self._stop_event = threading.Event()
         self.alert_rules = {}
+        # 预解析的规则：名称 -> AlertRule
+        self._compiled_rules = {}
+        # 指标名 -> {规则名: AlertRule}，每轮只检查数值有变化的指标对应的规则
+        self._metric_to_rules = {}
+        # 新添加的规则所在指标，下一轮无论是否变化都检查一次
+        self._pending_rule_metrics = set()
         self.notification_channels = []
-        self.metrics_history = []
+        # 通知路由：严重级别 -> 该级别需要调用的渠道（订阅该级别的 + 不限级别的）
+        self._channels_by_severity = {}
+        self._all_channels = []
+        self._channel_routes = {}
+        self._default_channels = ()
+        self._notify_queue = queue.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+        self._notify_thread = None
+        self.dropped_notifications = 0
         self.max_history_size = 1000
+        # 历史指标环形缓冲：预分配的结构化数组，每次采样只写一行
+        self._hist = np.zeros(self.max_history_size, dtype=_HIST_DTYPE)
+        self._hist_idx = 0
+        self._hist_full = False
+        self._hist_lock = threading.Lock()
         
         # 监控指标
         self.metrics = {
@@ -41,16 +186,60 @@ class SystemMonitor:
             'thread_count': 0
         }
         
-        # 告警状态
-        self.alert_status = {}
+        # 告警状态：每条规则占一位，置位表示告警中
+        self._alert_bits = 0
+        self._next_bit = 0
+        
+        # CPU使用率采用非阻塞读取：先调用一次建立psutil内部的基准，之后每次返回距上次调用的平均值
+        psutil.cpu_percent(interval=None)
+        self._last_cpu_ts = time.monotonic()
+        
+        # 最近一次有人读取状态或触发告警的时间，用于空闲降频
+        self._last_observe_ts = time.monotonic()
+        
+        # 采集计数（用于降低慢变指标的采样频率）与温度传感器可用性
+        self._collect_count = 0
+        self._temp_supported = True
         
-        # 日志记录器
-        import logging
-        self.logger = logging.getLogger(f"{__name__}.SystemMonitor")
+        # 温度节点与网络统计的文件描述符，打开失败时分别回退到psutil
+        self._thermal_fd = None
+        self._net_dev_fd = None
+        self._open_proc_files()
+        
+    def _open_proc_files(self):
+        """打开并缓存温度节点和网络统计的文件描述符"""
+        if self._thermal_fd is None:
+            try:
+                self._thermal_fd = os.open(THERMAL_ZONE_PATH, os.O_RDONLY)
+            except OSError:
+                self._thermal_fd = None
+                
+        if self._net_dev_fd is None:
+            try:
+                self._net_dev_fd = os.open(NET_DEV_PATH, os.O_RDONLY)
+            except OSError:
+                self._net_dev_fd = None
+            
+    def _close_proc_files(self):
+        """关闭缓存的文件描述符"""
+        fds = (self._thermal_fd, self._net_dev_fd)
+        self._thermal_fd = self._net_dev_fd = None
+        for fd in fds:
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
         
     def start_system_monitoring(self, interval: float = 5.0) -> bool:
         """启动系统监控"""
         try:
+            # 上次停止时未及时退出的监控线程，先等它结束，避免清除停止事件后两个线程并存
+            if self.monitoring_thread and self.monitoring_thread.is_alive():
+                self.monitoring_thread.join()
+                
+            self._open_proc_files()
+            self._stop_event.clear()
             self.is_monitoring = True
             self.monitoring_thread = threading.Thread(
                 target=self._monitoring_loop,
@@ -58,210 +247,394 @@ class SystemMonitor:
                 daemon=True
             )
             self.monitoring_thread.start()
+            self._start_notification_worker()
             
-            self.logger.info(f"系统监控已启动，间隔: {interval}秒")
+            self.logger.info("系统监控已启动，间隔: %s秒", interval)
             return True
             
         except Exception as e:
-            self.logger.error(f"启动系统监控失败: {e}")
+            self.logger.error("启动系统监控失败: %s", e)
             return False
             
     def stop_system_monitoring(self) -> bool:
         """停止系统监控"""
         try:
             self.is_monitoring = False
+            self._stop_event.set()
             if self.monitoring_thread:
-                self.monitoring_thread.join(timeout=5.0)
+                self.monitoring_thread.join(timeout=STOP_JOIN_TIMEOUT)
+                
+            if self.monitoring_thread and self.monitoring_thread.is_alive():
+                # 本轮采集尚未结束，线程会在本轮后自行退出；文件描述符留给它读完
+                self.logger.warning("监控线程仍在完成本轮采集，将在本轮结束后退出")
+            else:
+                self.monitoring_thread = None
+                self._close_proc_files()
+            self._stop_notification_worker()
                 
             self.logger.info("系统监控已停止")
             return True
             
         except Exception as e:
-            self.logger.error(f"停止系统监控失败: {e}")
+            self.logger.error("停止系统监控失败: %s", e)
             return False
             
     def _monitoring_loop(self, interval: float):
-        """监控循环"""
-        while self.is_monitoring:
+        """监控循环
+        
+        按截止时间调度：每轮的等待时间扣除本轮采集耗时，采样周期不随工作量漂移
+        """
+        next_tick = time.monotonic() + interval
+        idle_ticks = 0
+        while not self._stop_event.is_set():
             try:
-                # 收集系统指标
-                self._collect_system_metrics()
-                
-                # 检查告警规则
-                self._check_alert_rules()
-                
-                # 保存历史数据
-                self._save_metrics_to_history()
-                
-                time.sleep(interval)
+                # 空闲时每IDLE_POLL_FACTOR个周期才采集一次
+                if self._is_idle():
+                    idle_ticks += 1
+                else:
+                    idle_ticks = 0
+                    
+                if idle_ticks % IDLE_POLL_FACTOR == 0:
+                    # 收集系统指标
+                    changed = self._collect_system_metrics()
+                    
+                    # 检查告警规则（只检查数值变化的指标）
+                    self._check_alert_rules(changed)
+                    
+                    # 保存历史数据
+                    self._save_metrics_to_history()
                 
             except Exception as e:
-                self.logger.error(f"监控循环错误: {e}")
-                time.sleep(interval)
+                self.logger.error("监控循环错误: %s", e)
+                
+            now = time.monotonic()
+            if now > next_tick:
+                # 本轮耗时超过一个周期，从当前时刻重新对齐，避免连续补跑
+                next_tick = now
+            self._stop_event.wait(next_tick - now)
+            next_tick += interval
+            
+    def _is_idle(self) -> bool:
+        """没有通知渠道、没有告警规则且近期无人读取状态时视为空闲"""
+        return (not self.notification_channels
+                and not self._compiled_rules
+                and time.monotonic() - self._last_observe_ts > IDLE_OBSERVE_TIMEOUT)
                 
     def _collect_system_metrics(self):
-        """收集系统指标"""
+        """
+        收集系统指标
+        
+        每轮在新字典中填充指标，结束后整体替换 self.metrics（引用赋值是原子的）；
+        读取方只需取一次 self.metrics 引用，得到的快照不会再被监控线程修改
+        
+        Returns:
+            set: 本轮数值发生变化的指标名
+        """
+        previous = self.metrics
+        metrics = dict(previous)
         try:
-            # CPU使用率
-            self.metrics['cpu_percent'] = psutil.cpu_percent(interval=1)
+            # CPU使用率（非阻塞，不再占用监控线程1秒）
+            now = time.monotonic()
+            if now - self._last_cpu_ts >= CPU_PERCENT_MIN_INTERVAL:
+                metrics['cpu_percent'] = psutil.cpu_percent(interval=None)
+                self._last_cpu_ts = now
             
             # 内存使用率
             memory = psutil.virtual_memory()
-            self.metrics['memory_percent'] = memory.percent
-            
-            # 磁盘使用率
-            disk = psutil.disk_usage('/')
-            self.metrics['disk_usage'] = disk.percent
-            
-            # 网络统计
-            network = psutil.net_io_counters()
-            self.metrics['network_bytes_sent'] = network.bytes_sent
-            self.metrics['network_bytes_recv'] = network.bytes_recv
-            
-            # 进程和线程数
-            self.metrics['process_count'] = len(psutil.pids())
-            self.metrics['thread_count'] = threading.active_count()
-            
-            # 温度（如果可用）
-            try:
-                temperatures = psutil.sensors_temperatures()
-                if 'cpu_thermal' in temperatures:
-                    self.metrics['temperature'] = temperatures['cpu_thermal'][0].current
-                else:
-                    self.metrics['temperature'] = 0.0
-            except (AttributeError, IOError):
-                self.metrics['temperature'] = 0.0
+            metrics['memory_percent'] = memory.percent
+            
+            # 慢变指标：磁盘使用率与进程数，每SLOW_METRICS_EVERY次采集读取一次
+            # psutil.pids()会构造包含全部PID的列表，只为取长度，没必要每次都做
+            if self._collect_count % SLOW_METRICS_EVERY == 0:
+                metrics['disk_usage'] = psutil.disk_usage('/').percent
+                metrics['process_count'] = len(psutil.pids())
+            self._collect_count += 1
+            
+            # 网络统计：一次pread读取/proc/net/dev，不可用时回退到psutil
+            if self._net_dev_fd is not None:
+                metrics['network_bytes_recv'], metrics['network_bytes_sent'] = _read_net_dev(self._net_dev_fd)
+            else:
+                network = psutil.net_io_counters()
+                metrics['network_bytes_sent'] = network.bytes_sent
+                metrics['network_bytes_recv'] = network.bytes_recv
+            
+            # 线程数
+            metrics['thread_count'] = threading.active_count()
+            
+            # 温度：直接读sysfs节点，只需一次lseek+read
+            if self._thermal_fd is not None:
+                try:
+                    os.lseek(self._thermal_fd, 0, os.SEEK_SET)
+                    metrics['temperature'] = int(os.read(self._thermal_fd, 16)) / 1000.0
+                except (OSError, ValueError):
+                    metrics['temperature'] = 0.0
+            # 回退到psutil（如果可用；首次失败后不再尝试）
+            elif self._temp_supported:
+                try:
+                    temperatures = psutil.sensors_temperatures()
+                    if 'cpu_thermal' in temperatures:
+                        metrics['temperature'] = temperatures['cpu_thermal'][0].current
+                    else:
+                        metrics['temperature'] = 0.0
+                except (AttributeError, IOError):
+                    self._temp_supported = False
+                    metrics['temperature'] = 0.0
                 
         except Exception as e:
-            self.logger.error(f"收集系统指标失败: {e}")
+            self.logger.error("收集系统指标失败: %s", e)
+        finally:
+            self.metrics = metrics
             
-    def _check_alert_rules(self):
-        """检查告警规则"""
-        for rule_name, rule_config in self.alert_rules.items():
+        return {name for name, value in metrics.items() if previous.get(name) != value}
+            
+    def _check_alert_rules(self, changed_metrics: Optional[set] = None):
+        """
+        检查告警规则
+        
+        Args:
+            changed_metrics: 本轮有变化的指标名；为None时检查全部规则
+        """
+        metrics = self.metrics
+        if changed_metrics is None:
+            rules = list(self._compiled_rules.values())
+        else:
+            pending, self._pending_rule_metrics = self._pending_rule_metrics, set()
+            metric_to_rules = self._metric_to_rules
+            rules = [rule
+                     for metric_name in (changed_metrics | pending)
+                     for rule in list(metric_to_rules.get(metric_name, {}).values())]
+            
+        for rule in rules:
             try:
-                metric_name = rule_config.get('metric')
-                threshold = rule_config.get('threshold')
-                operator = rule_config.get('operator', '>')
-                severity = rule_config.get('severity', 'warning')
-                
-                if metric_name not in self.metrics:
+                if rule.metric not in metrics:
                     continue
                     
-                current_value = self.metrics[metric_name]
+                current_value = metrics[rule.metric]
                 
                 # 检查阈值
-                triggered = False
-                if operator == '>':
-                    triggered = current_value > threshold
-                elif operator == '<':
-                    triggered = current_value < threshold
-                elif operator == '>=':
-                    triggered = current_value >= threshold
-                elif operator == '<=':
-                    triggered = current_value <= threshold
-                elif operator == '==':
-                    triggered = current_value == threshold
-                elif operator == '!=':
-                    triggered = current_value != threshold
+                triggered = rule.compare(current_value, rule.threshold)
                     
                 # 更新告警状态
+                mask = rule.mask
+                active = self._alert_bits & mask
                 if triggered:
-                    if not self.alert_status.get(rule_name, False):
+                    if not active:
                         # 新触发的告警
-                        self._trigger_alert(rule_name, rule_config, current_value)
-                        self.alert_status[rule_name] = True
+                        self._trigger_alert(rule, current_value)
+                        self._alert_bits |= mask
                 else:
-                    if self.alert_status.get(rule_name, False):
+                    if active:
                         # 恢复的告警
-                        self._recover_alert(rule_name, rule_config, current_value)
-                        self.alert_status[rule_name] = False
+                        self._recover_alert(rule, current_value)
+                        self._alert_bits &= ~mask
                         
             except Exception as e:
-                self.logger.error(f"检查告警规则 {rule_name} 失败: {e}")
+                self.logger.error("检查告警规则 %s 失败: %s", rule.name, e)
                 
-    def _trigger_alert(self, rule_name: str, rule_config: Dict[str, Any], current_value: float):
+    def _trigger_alert(self, rule: AlertRule, current_value: float):
         """触发告警"""
+        self._last_observe_ts = time.monotonic()
         try:
+            rule_name, operator, threshold = rule.name, rule.operator, rule.threshold
+            
+            # 日志参数延迟格式化，级别被关闭时不产生字符串
+            self.logger.warning("告警触发: 告警: %s 当前值 %s 触发阈值 %s %s",
+                                rule_name, current_value, operator, threshold)
+            
+            # 没有关注该级别的通知渠道时无需构造通知数据
+            if not self._channels_for(rule.severity):
+                return
+                
             alert_data = {
                 'rule_name': rule_name,
-                'severity': rule_config.get('severity', 'warning'),
-                'metric': rule_config.get('metric'),
+                'severity': rule.severity,
+                'metric': rule.metric,
                 'current_value': current_value,
-                'threshold': rule_config.get('threshold'),
-                'operator': rule_config.get('operator', '>'),
+                'threshold': threshold,
+                'operator': operator,
                 'timestamp': time.time(),
-                'message': f"告警: {rule_name} 当前值 {current_value} 触发阈值 {rule_config.get('operator', '>')} {rule_config.get('threshold')}"
+                'message': f"告警: {rule_name} 当前值 {current_value} 触发阈值 {operator} {threshold}"
             }
             
-            self.logger.warning(f"告警触发: {alert_data['message']}")
-            
             # 发送通知
             self._send_alert_notifications(alert_data)
             
         except Exception as e:
-            self.logger.error(f"触发告警失败: {e}")
+            self.logger.error("触发告警失败: %s", e)
             
-    def _recover_alert(self, rule_name: str, rule_config: Dict[str, Any], current_value: float):
+    def _recover_alert(self, rule: AlertRule, current_value: float):
         """恢复告警"""
         try:
+            rule_name = rule.name
+            self.logger.info("告警恢复: 恢复: %s 当前值 %s 已恢复正常", rule_name, current_value)
+            
+            if not self._channels_for('info'):
+                return
+                
             recovery_data = {
                 'rule_name': rule_name,
                 'severity': 'info',
-                'metric': rule_config.get('metric'),
+                'metric': rule.metric,
                 'current_value': current_value,
-                'threshold': rule_config.get('threshold'),
-                'operator': rule_config.get('operator', '>'),
+                'threshold': rule.threshold,
+                'operator': rule.operator,
                 'timestamp': time.time(),
                 'message': f"恢复: {rule_name} 当前值 {current_value} 已恢复正常"
             }
             
-            self.logger.info(f"告警恢复: {recovery_data['message']}")
-            
             # 发送恢复通知
             self._send_alert_notifications(recovery_data)
             
         except Exception as e:
-            self.logger.error(f"恢复告警失败: {e}")
+            self.logger.error("恢复告警失败: %s", e)
             
     def _send_alert_notifications(self, alert_data: Dict[str, Any]):
-        """发送告警通知"""
-        for channel in self.notification_channels:
-            try:
-                channel(alert_data)
-            except Exception as e:
-                self.logger.error(f"发送通知失败: {e}")
+        """发送告警通知（入队后立即返回，不阻塞监控线程）"""
+        if not self._channels_for(alert_data.get('severity')):
+            return
+            
+        self._start_notification_worker()
+        try:
+            self._notify_queue.put_nowait(alert_data)
+        except queue.Full:
+            self.dropped_notifications += 1
+            self.logger.warning("通知队列已满，丢弃通知: %s", alert_data.get('rule_name'))
+            
+    def _start_notification_worker(self):
+        """启动通知线程"""
+        if self._notify_thread and self._notify_thread.is_alive():
+            return
+            
+        self._notify_thread = threading.Thread(target=self._notification_worker, name="MonitorNotify")
+        self._notify_thread.daemon = True
+        self._notify_thread.start()
+        
+    def _stop_notification_worker(self, timeout: float = 2.0):
+        """停止通知线程，队列中剩余的通知发送完毕后退出"""
+        if not self._notify_thread or not self._notify_thread.is_alive():
+            return
+            
+        try:
+            self._notify_queue.put(_NOTIFY_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.warning("通知队列已满，无法通知通知线程退出")
+            return
+        self._notify_thread.join(timeout)
+        self._notify_thread = None
+        
+    def _notification_worker(self):
+        """通知线程：攒满NOTIFY_BATCH_SIZE条或等待NOTIFY_FLUSH_INTERVAL后按批发送"""
+        notify_queue = self._notify_queue
+        running = True
+        while running:
+            item = notify_queue.get()
+            batch = []
+            deadline = time.monotonic() + NOTIFY_FLUSH_INTERVAL
+            while True:
+                if item is _NOTIFY_STOP:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= NOTIFY_BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = notify_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                    
+            if batch:
+                self._deliver_notifications(batch)
+                
+    def _channels_for(self, severity: Optional[str]) -> tuple:
+        """获取某一严重级别需要通知的渠道"""
+        return self._channel_routes.get(severity, self._default_channels)
+        
+    def _deliver_notifications(self, batch: list):
+        """按渠道分组发送一批通知，每条通知只发给关注其严重级别的渠道"""
+        groups = {}
+        for alert_data in batch:
+            for channel in self._channels_for(alert_data.get('severity')):
+                groups.setdefault(channel, []).append(alert_data)
+                
+        for channel, alerts in groups.items():
+            for alert_data in alerts:
+                try:
+                    channel(alert_data)
+                except Exception as e:
+                    self.logger.error("发送通知失败: %s", e)
                 
     def _save_metrics_to_history(self):
         """保存指标到历史记录"""
         try:
-            metrics_copy = self.metrics.copy()
-            metrics_copy['timestamp'] = time.time()
-            
-            self.metrics_history.append(metrics_copy)
-            
-            # 限制历史记录大小
-            if len(self.metrics_history) > self.max_history_size:
-                self.metrics_history.pop(0)
+            metrics = self.metrics
+            row = tuple(metrics.get(name, 0) for name in _HIST_METRICS) + (time.time(),)
+            
+            with self._hist_lock:
+                self._hist[self._hist_idx] = row
+                self._hist_idx += 1
+                if self._hist_idx >= self.max_history_size:
+                    self._hist_idx = 0
+                    self._hist_full = True
                 
         except Exception as e:
-            self.logger.error(f"保存历史指标失败: {e}")
-            
+            self.logger.error("保存历史指标失败: %s", e)
+            
+    def _history_snapshot(self) -> np.ndarray:
+        """按时间顺序返回历史记录数组的副本"""
+        with self._hist_lock:
+            if self._hist_full:
+                return np.concatenate((self._hist[self._hist_idx:], self._hist[:self._hist_idx]))
+            return self._hist[:self._hist_idx].copy()
+            
+    @staticmethod
+    def _history_to_dicts(rows: np.ndarray) -> list:
+        """将历史记录数组转换为字典列表（仅在对外接口处转换）"""
+        names = _HIST_DTYPE.names
+        return [dict(zip(names, row)) for row in rows.tolist()]
+        
+    @property
+    def metrics_history(self) -> list:
+        """历史指标（按时间顺序的字典列表）"""
+        return self._history_to_dicts(self._history_snapshot())
+        
     def add_alert_rule(self, name: str, metric: str, threshold: float, 
                       operator: str = '>', severity: str = 'warning') -> bool:
         """添加告警规则"""
         try:
+            compare = _OPS.get(operator)
+            if compare is None:
+                self.logger.error("不支持的告警运算符: %s", operator)
+                return False
+                
+            # 同名规则重新添加时沿用原来的状态位
+            previous = self._compiled_rules.get(name)
+            if previous is not None:
+                mask = previous.mask
+                self._metric_to_rules.get(previous.metric, {}).pop(name, None)
+            else:
+                mask = 1 << self._next_bit
+                self._next_bit += 1
+                
+            # alert_rules 保留普通字典供导出和外部读取，检查时只用 AlertRule
             self.alert_rules[name] = {
                 'metric': metric,
                 'threshold': threshold,
                 'operator': operator,
                 'severity': severity
             }
+            rule = AlertRule(name, metric, threshold, operator, severity, compare, mask)
+            self._compiled_rules[name] = rule
+            self._metric_to_rules.setdefault(metric, {})[name] = rule
+            self._pending_rule_metrics.add(metric)
             
-            self.logger.info(f"添加告警规则: {name} - {metric} {operator} {threshold}")
+            self.logger.info("添加告警规则: %s - %s %s %s", name, metric, operator, threshold)
             return True
             
         except Exception as e:
-            self.logger.error(f"添加告警规则失败: {e}")
+            self.logger.error("添加告警规则失败: %s", e)
             return False
             
     def remove_alert_rule(self, name: str) -> bool:
@@ -269,113 +642,185 @@ class SystemMonitor:
         try:
             if name in self.alert_rules:
                 del self.alert_rules[name]
-                if name in self.alert_status:
-                    del self.alert_status[name]
+                rule = self._compiled_rules.pop(name, None)
+                if rule is not None:
+                    self._alert_bits &= ~rule.mask
+                    self._metric_to_rules.get(rule.metric, {}).pop(name, None)
                     
-                self.logger.info(f"移除告警规则: {name}")
+                self.logger.info("移除告警规则: %s", name)
                 return True
             return False
             
         except Exception as e:
-            self.logger.error(f"移除告警规则失败: {e}")
+            self.logger.error("移除告警规则失败: %s", e)
             return False
             
-    def add_notification_channel(self, channel: callable) -> bool:
-        """添加通知渠道"""
+    def add_notification_channel(self, channel: callable, severities: Optional[set] = None) -> bool:
+        """
+        添加通知渠道
+        
+        Args:
+            channel: 通知回调，参数为告警数据字典
+            severities: 只接收这些严重级别的通知（如 {'critical'}）；None表示全部级别。
+                恢复通知的级别为 'info'
+        """
         try:
             self.notification_channels.append(channel)
+            if severities:
+                for severity in severities:
+                    self._channels_by_severity.setdefault(severity, []).append(channel)
+            else:
+                self._all_channels.append(channel)
+                
+            # 重建路由表，发送时只需一次字典查找
+            self._default_channels = tuple(self._all_channels)
+            self._channel_routes = {
+                severity: tuple(channels) + self._default_channels
+                for severity, channels in self._channels_by_severity.items()
+            }
             self.logger.info("添加通知渠道成功")
             return True
             
         except Exception as e:
-            self.logger.error(f"添加通知渠道失败: {e}")
+            self.logger.error("添加通知渠道失败: %s", e)
             return False
             
+    @property
+    def alert_status(self) -> Dict[str, bool]:
+        """各规则的告警状态（由状态位掩码生成）"""
+        bits = self._alert_bits
+        return {name: bool(bits & rule.mask) for name, rule in self._compiled_rules.items()}
+        
+    def get_active_alert_count(self) -> int:
+        """当前处于告警状态的规则数"""
+        return bin(self._alert_bits).count('1')
+        
     def get_current_system_status(self) -> Dict[str, Any]:
-        """获取当前系统状态"""
+        """
+        获取当前系统状态
+        
+        metrics 为本轮采集快照的只读视图，监控线程不会再修改它；
+        alert_rules 为内部字典的只读视图（不复制），调用方如需保存请自行 dict(...) 复制
+        """
+        self._last_observe_ts = time.monotonic()
         return {
-            'metrics': self.metrics.copy(),
-            'alert_rules': self.alert_rules.copy(),
-            'alert_status': self.alert_status.copy(),
+            'metrics': MappingProxyType(self.metrics),
+            'alert_rules': MappingProxyType(self.alert_rules),
+            'alert_status': self.alert_status,
+            'active_alerts': self.get_active_alert_count(),
             'is_monitoring': self.is_monitoring,
-            'history_size': len(self.metrics_history)
+            'history_size': self.max_history_size if self._hist_full else self._hist_idx
         }
         
     def get_metrics_history(self, duration: int = 3600) -> list:
         """获取指标历史"""
+        self._last_observe_ts = time.monotonic()
         try:
             current_time = time.time()
             cutoff_time = current_time - duration
             
-            filtered_history = [
-                metrics for metrics in self.metrics_history
-                if metrics.get('timestamp', 0) >= cutoff_time
-            ]
+            # 时间戳按写入顺序递增，二分查找截止位置
+            history = self._history_snapshot()
+            start = np.searchsorted(history['timestamp'], cutoff_time, side='left')
             
-            return filtered_history
+            return self._history_to_dicts(history[start:])
             
         except Exception as e:
-            self.logger.error(f"获取指标历史失败: {e}")
+            self.logger.error("获取指标历史失败: %s", e)
             return []
             
     def export_metrics_to_file(self, filepath: str, format: str = 'json') -> bool:
         """导出指标到文件"""
         try:
-            data = {
-                'current_metrics': self.metrics,
-                'alert_rules': self.alert_rules,
-                'alert_status': self.alert_status,
-                'metrics_history': self.metrics_history[-100:],  # 最近100条
-                'export_time': time.time()
-            }
+            recent_history = self._history_snapshot()[-100:]  # 最近100条
             
             if format.lower() == 'json':
-                with open(filepath, 'w') as f:
-                    json.dump(data, f, indent=2)
+                data = {
+                    'current_metrics': self.metrics,
+                    'alert_rules': self.alert_rules,
+                    'alert_status': self.alert_status,
+                    'metrics_history': self._history_to_dicts(recent_history),
+                    'export_time': time.time()
+                }
+                if ORJSON_AVAILABLE:
+                    with open(filepath, 'wb') as f:
+                        f.write(orjson.dumps(data, default=_json_default, option=orjson.OPT_INDENT_2))
+                else:
+                    with open(filepath, 'w') as f:
+                        json.dump(data, f, indent=2)
             elif format.lower() == 'csv':
                 import csv
                 with open(filepath, 'w', newline='') as f:
-                    if self.metrics_history:
-                        writer = csv.DictWriter(f, fieldnames=self.metrics_history[0].keys())
-                        writer.writeheader()
-                        writer.writerows(self.metrics_history[-100:])
+                    if len(recent_history):
+                        # 直接逐行写结构化数组，不再转换为字典
+                        writer = csv.writer(f)
+                        writer.writerow(_HIST_DTYPE.names)
+                        writer.writerows(recent_history.tolist())
             else:
-                self.logger.error(f"不支持的导出格式: {format}")
+                self.logger.error("不支持的导出格式: %s", format)
                 return False
                 
-            self.logger.info(f"指标导出成功: {filepath}")
+            self.logger.info("指标导出成功: %s", filepath)
             return True
             
         except Exception as e:
-            self.logger.error(f"导出指标失败: {e}")
+            self.logger.error("导出指标失败: %s", e)
             return False
 
 
 class SystemHealthChecker:
     """系统健康检查器"""
     
+    logger = logging.getLogger(f"{__name__}.SystemHealthChecker")
+    
     def __init__(self, config_manager: ConfigManager):
         """初始化健康检查器"""
         self.config_manager = config_manager
         self.health_checks = {}
         self.last_check_results = {}
         
-        import logging
-        self.logger = logging.getLogger(f"{__name__}.SystemHealthChecker")
+        # 结果缓存：只有刷新时加锁，并发调用方在锁内二次检查后复用刚刷新的结果
+        self.cache_ttl = HEALTH_CHECK_TTL
+        self._last_check_ts = 0.0
+        self._refresh_lock = threading.Lock()
         
     def register_health_check(self, name: str, check_func: callable) -> bool:
         """注册健康检查"""
         try:
             self.health_checks[name] = check_func
-            self.logger.info(f"注册健康检查: {name}")
+            self._last_check_ts = 0.0  # 检查项变化，缓存失效
+            self.logger.info("注册健康检查: %s", name)
             return True
             
         except Exception as e:
-            self.logger.error(f"注册健康检查失败: {e}")
+            self.logger.error("注册健康检查失败: %s", e)
             return False
             
-    def run_health_checks(self) -> Dict[str, Any]:
-        """运行所有健康检查"""
+    def run_health_checks(self, force: bool = False) -> Dict[str, Any]:
+        """
+        运行所有健康检查
+        
+        Args:
+            force: 忽略缓存强制重新检查
+            
+        Returns:
+            Dict[str, Any]: 检查结果，cache_ttl 秒内重复调用返回缓存结果
+        """
+        if not force and self._is_cache_fresh():
+            return self.last_check_results
+            
+        with self._refresh_lock:
+            # 二次检查：等锁期间其他线程可能已刷新
+            if not force and self._is_cache_fresh():
+                return self.last_check_results
+            return self._refresh_health_checks()
+            
+    def _is_cache_fresh(self) -> bool:
+        """缓存结果是否仍在有效期内"""
+        return bool(self.last_check_results) and time.monotonic() - self._last_check_ts < self.cache_ttl
+        
+    def _refresh_health_checks(self) -> Dict[str, Any]:
+        """执行全部检查并更新缓存"""
         results = {
             'overall_status': 'healthy',
             'checks': {},
@@ -393,7 +838,7 @@ class SystemHealthChecker:
                     failed_checks.append(name)
                     
             except Exception as e:
-                self.logger.error(f"健康检查 {name} 失败: {e}")
+                self.logger.error("健康检查 %s 失败: %s", name, e)
                 results['checks'][name] = {
                     'status': False,
                     'message': f"检查异常: {str(e)}",
@@ -407,29 +852,40 @@ class SystemHealthChecker:
             results['failed_checks'] = failed_checks
             
         self.last_check_results = results
+        self._last_check_ts = time.monotonic()
         return results
         
-    def get_system_health_report(self) -> str:
-        """获取系统健康报告"""
-        results = self.run_health_checks()
+    def get_system_health_report(self, results: Optional[Dict[str, Any]] = None) -> str:
+        """
+        获取系统健康报告
+        
+        Args:
+            results: 已有的检查结果，不传则使用 run_health_checks()（有效期内为缓存结果）
+        """
+        if results is None:
+            results = self.run_health_checks()
         
-        report = f"系统健康检查报告\n"
-        report += f"时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(results['timestamp']))}\n"
-        report += f"整体状态: {results['overall_status']}\n\n"
+        parts = [
+            "系统健康检查报告\n",
+            f"时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(results['timestamp']))}\n",
+            f"整体状态: {results['overall_status']}\n\n",
+        ]
         
         for name, check in results['checks'].items():
             status_symbol = "✓" if check.get('status', False) else "✗"
-            report += f"{status_symbol} {name}: {check.get('message', '未知')}\n"
+            parts.append(f"{status_symbol} {name}: {check.get('message', '未知')}\n")
             
         if 'failed_checks' in results:
-            report += f"\n失败检查: {', '.join(results['failed_checks'])}\n"
+            parts.append(f"\n失败检查: {', '.join(results['failed_checks'])}\n")
             
-        return report
+        return ''.join(parts)
 
 
 class EnhancedSystemMonitor:
     """增强系统监控器 - 整合所有监控功能"""
     
+    logger = logging.getLogger(f"{__name__}.EnhancedSystemMonitor")
+    
     def __init__(self, config_manager: ConfigManager, mqtt_manager: Optional[SorterMQTTManager] = None):
         """初始化增强系统监控器"""
         self.config_manager = config_manager
@@ -448,9 +904,6 @@ class EnhancedSystemMonitor:
         # 如果配置了MQTT，添加MQTT通知渠道
         if mqtt_manager:
             self._setup_mqtt_notifications()
-            
-        import logging
-        self.logger = logging.getLogger(f"{__name__}.EnhancedSystemMonitor")
         
     def _setup_default_alert_rules(self):
         """设置默认告警规则"""
@@ -558,7 +1011,7 @@ class EnhancedSystemMonitor:
                 )
                 
             except Exception as e:
-                self.logger.error(f"MQTT通知失败: {e}")
+                self.logger.error("MQTT通知失败: %s", e)
                 
         self.system_monitor.add_notification_channel(mqtt_notification)
         
@@ -575,7 +1028,7 @@ class EnhancedSystemMonitor:
             return True
             
         except Exception as e:
-            self.logger.error(f"启动增强监控失败: {e}")
+            self.logger.error("启动增强监控失败: %s", e)
             return False
             
     def stop_monitoring(self) -> bool:
@@ -586,7 +1039,7 @@ class EnhancedSystemMonitor:
             return True
             
         except Exception as e:
-            self.logger.error(f"停止增强监控失败: {e}")
+            self.logger.error("停止增强监控失败: %s", e)
             return False
             
     def get_comprehensive_system_status(self) -> Dict[str, Any]:
@@ -619,7 +1072,7 @@ class EnhancedSystemMonitor:
             return 'warning'
             
         # 基于告警状态
-        active_alerts = sum(1 for status in system_status['alert_status'].values() if status)
+        active_alerts = system_status['active_alerts']
         if active_alerts > 3:
             return 'critical'
         if active_alerts > 0:
@@ -640,16 +1093,16 @@ class EnhancedSystemMonitor:
                 f"系统状态: {status['overall_status']}"
             )
             
-            # 发布详细状态到专用主题
+            # 发布详细状态到专用主题（直接序列化为字节，MQTT层不再做json.dumps）
             self.mqtt_manager.publish_message(
                 'pi_sorter/system/detailed',
-                status
+                _dumps_status(status)
             )
             
             return True
             
         except Exception as e:
-            self.logger.error(f"MQTT发布系统状态失败: {e}")
+            self.logger.error("MQTT发布系统状态失败: %s", e)
             return False
 
 
@@ -733,7 +1186,55 @@ class TestSystemMonitor(unittest.TestCase):
         notification_received.wait(timeout=1.0)
         self.assertTrue(notification_received.is_set())
         self.assertEqual(received_data['message'], '测试告警')
-        
+
+    def test_notification_does_not_block_caller(self):
+        """测试慢速通知渠道不阻塞监控线程"""
+        release = threading.Event()
+        delivered = []
+
+        def slow_channel(alert_data):
+            release.wait(timeout=2.0)
+            delivered.append(alert_data['rule_name'])
+
+        self.system_monitor.add_notification_channel(slow_channel)
+
+        start = time.monotonic()
+        for i in range(3):
+            self.system_monitor._send_alert_notifications({'rule_name': f'r{i}'})
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        release.set()
+        self.system_monitor._stop_notification_worker()
+        self.assertEqual(delivered, ['r0', 'r1', 'r2'])
+
+    def test_notification_channel_severity_filter(self):
+        """测试按严重级别订阅的通知渠道"""
+        critical_only = []
+        everything = []
+
+        self.system_monitor.add_notification_channel(critical_only.append, severities={'critical'})
+        self.system_monitor.add_notification_channel(everything.append)
+
+        self.system_monitor._send_alert_notifications({'rule_name': 'w', 'severity': 'warning'})
+        self.system_monitor._send_alert_notifications({'rule_name': 'c', 'severity': 'critical'})
+        self.system_monitor._stop_notification_worker()
+
+        self.assertEqual([a['rule_name'] for a in critical_only], ['c'])
+        self.assertEqual([a['rule_name'] for a in everything], ['w', 'c'])
+
+    def test_metrics_history_ring(self):
+        """测试历史记录环形缓冲按时间顺序淘汰旧数据"""
+        size = self.system_monitor.max_history_size
+        for i in range(size + 5):
+            self.system_monitor.metrics['cpu_percent'] = float(i)
+            self.system_monitor._save_metrics_to_history()
+
+        history = self.system_monitor.get_metrics_history(duration=60)
+        self.assertEqual(len(history), size)
+        self.assertEqual(history[0]['cpu_percent'], 5.0)
+        self.assertEqual(history[-1]['cpu_percent'], float(size + 4))
+        self.assertEqual(self.system_monitor.get_current_system_status()['history_size'], size)
+
     def test_get_current_system_status(self):
         """测试获取当前系统状态"""
         status = self.system_monitor.get_current_system_status()
@@ -851,7 +1352,21 @@ class TestEnhancedSystemMonitor(unittest.TestCase):
         self.assertIn('config_files', health_checks)
         self.assertIn('disk_space', health_checks)
         self.assertIn('memory_usage', health_checks)
-        
+
+    def test_health_checks_cached_within_ttl(self):
+        """测试有效期内重复调用复用健康检查结果"""
+        checker = self.enhanced_monitor.health_checker
+        calls = []
+        checker.register_health_check('counted', lambda: calls.append(1) or {'status': True})
+
+        first = checker.run_health_checks()
+        second = checker.run_health_checks()
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+
+        checker.run_health_checks(force=True)
+        self.assertEqual(len(calls), 2)
+
     def test_overall_status_calculation(self):
         """测试整体状态计算"""
         # 模拟高CPU使用率
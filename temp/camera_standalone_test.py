@@ -4,18 +4,90 @@
 专注于测试picamera2的基本功能
 """
 
+import os
 import sys
+import json
 import time
-import traceback
 
-print("===== 独立摄像头测试开始 =====")
-print(f"Python版本: {sys.version}")
-print("开始导入picamera2...")
+# 设置环境变量 PI_SORTER_DEBUG 后才输出完整的摄像头信息（包括格式列表）
+DEBUG = bool(os.environ.get("PI_SORTER_DEBUG"))
 
-try:
-    # 尝试导入picamera2
-    import picamera2
-    print("✓ picamera2导入成功")
+# 上次自动曝光/白平衡收敛后的参数；设置 PI_SORTER_FIXED_LIGHTING 时直接套用，跳过收敛等待
+AE_CACHE_FILE = os.path.expanduser("~/.pi_sorter_camera_cache.json")
+FIXED_LIGHTING = bool(os.environ.get("PI_SORTER_FIXED_LIGHTING"))
+AE_CONVERGE_TIMEOUT = 2.0
+
+
+def load_ae_cache():
+    """读取缓存的曝光参数，不存在或损坏时返回None"""
+    try:
+        with open(AE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_ae_cache(metadata, converge_time):
+    """保存收敛后的曝光参数，供固定光照下的后续运行直接使用"""
+    cache = {
+        "ExposureTime": metadata.get("ExposureTime"),
+        "AnalogueGain": metadata.get("AnalogueGain"),
+        "ColourGains": list(metadata.get("ColourGains") or ()),
+        "converge_time": converge_time
+    }
+    try:
+        with open(AE_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"⚠️ 保存曝光缓存失败: {e}")
+
+
+def wait_for_ae_convergence(cam, timeout=AE_CONVERGE_TIMEOUT):
+    """
+    轮询元数据直到自动曝光锁定且白平衡增益可用
+
+    capture_metadata每帧返回一次，不需要额外sleep；
+    返回 (是否收敛, 耗时秒数, 最后一帧元数据)
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    metadata = {}
+    while time.monotonic() < deadline:
+        metadata = cam.capture_metadata()
+        if metadata.get("AeLocked") and metadata.get("ColourGains"):
+            return True, time.monotonic() - start, metadata
+    return False, time.monotonic() - start, metadata
+
+
+def capture_into(cam, out=None):
+    """
+    捕获一帧并复制到预先分配的数组out中
+
+    out为None或尺寸不符时分配一次，之后循环采集可反复传入同一数组，
+    每帧只做一次复制，不再分配新的numpy数组
+    """
+    request = cam.capture_request()
+    try:
+        with picamera2.MappedArray(request, "main") as mapped:
+            if out is None or out.shape != mapped.array.shape:
+                out = np.empty_like(mapped.array)
+            np.copyto(out, mapped.array)
+    finally:
+        # 映射视图只在请求释放前有效，复制完立即归还缓冲区
+        request.release()
+    return out
+
+
+def print_exc():
+    """打印当前异常的堆栈；traceback只在出错时才导入"""
+    import traceback
+    traceback.print_exc()
+
+
+def load_camera_stack():
+    """检测到摄像头后才导入的显示/libcamera相关模块"""
+    global np
+    import numpy as np
     
     # 尝试导入pykms
     import pykms
@@ -27,6 +99,16 @@ try:
         print("✓ libcamera Transform导入成功")
     except ImportError as e:
         print(f"✗ libcamera导入失败: {e}")
+
+
+print("===== 独立摄像头测试开始 =====")
+print(f"Python版本: {sys.version}")
+print("开始导入picamera2...")
+
+try:
+    # 尝试导入picamera2
+    import picamera2
+    print("✓ picamera2导入成功")
     
     # 初始化摄像头
     print("正在初始化摄像头...")
@@ -34,11 +116,14 @@ try:
         # 先检查可用的摄像头列表
         print("检查可用的摄像头列表...")
         cameras = picamera2.Picamera2.global_camera_info()
-        print(f"✓ global_camera_info() 结果: {cameras}")
+        if DEBUG:
+            print(f"✓ global_camera_info() 结果: {cameras}")
         print(f"✓ 检测到摄像头数量: {len(cameras)}")
         
-        # 如果有摄像头，再创建实例
+        # 如果有摄像头，再导入其余模块并创建实例
         if len(cameras) > 0:
+            load_camera_stack()
+            
             # 创建Picamera2实例
             cam = picamera2.Picamera2()
             print("✓ Picamera2实例创建成功")
@@ -47,17 +132,23 @@ try:
             raise Exception("No cameras detected")
         
         if len(cameras) > 0:
-            for i, camera_info in enumerate(cameras):
-                print(f"\n摄像头 {i} 信息:")
-                print(f"  型号: {camera_info['Model']}")
-                print(f"  位置: {camera_info['Location']}")
-                print(f"  唯一ID: {camera_info['Id']}")
-                print(f"  支持的格式: {camera_info['formats']}")
+            if DEBUG:
+                sys.stdout.write("".join(
+                    f"\n摄像头 {i} 信息:\n"
+                    f"  型号: {camera_info['Model']}\n"
+                    f"  位置: {camera_info['Location']}\n"
+                    f"  唯一ID: {camera_info['Id']}\n"
+                    f"  支持的格式: {camera_info['formats']}\n"
+                    for i, camera_info in enumerate(cameras)
+                ))
+            else:
+                print(f"摄像头型号: {[c['Model'] for c in cameras]}")
             
-            # 配置摄像头
+            # 配置摄像头（只用1个缓冲区，capture_array拿到的就是最新一帧，而不是队列里排队的旧帧）
             print("\n配置摄像头...")
             config = cam.create_preview_configuration(
                 main={'size': (1280, 720)},
+                buffer_count=1,
                 controls={
                     "FrameRate": 30,
                     "AeEnable": True,
@@ -75,14 +166,32 @@ try:
             cam.start()
             print("✓ 摄像头启动成功")
             
+            # 关闭降噪，避免ISP额外排队一帧
+            cam.set_controls({"NoiseReductionMode": 0})
+            
             # 等待自动曝光稳定
-            print("等待2秒让自动曝光稳定...")
-            time.sleep(2)
+            ae_cache = load_ae_cache() if FIXED_LIGHTING else None
+            if ae_cache and ae_cache.get("ExposureTime") and ae_cache.get("ColourGains"):
+                # 固定光照：直接套用上次收敛的参数，无需等待
+                cam.set_controls({
+                    "ExposureTime": ae_cache["ExposureTime"],
+                    "AnalogueGain": ae_cache["AnalogueGain"],
+                    "ColourGains": tuple(ae_cache["ColourGains"])
+                })
+                print("✓ 已使用缓存的曝光参数，跳过自动曝光等待")
+            else:
+                print("等待自动曝光稳定...")
+                converged, converge_time, metadata = wait_for_ae_convergence(cam)
+                if converged:
+                    print(f"✓ 自动曝光已收敛，耗时 {converge_time:.2f} 秒")
+                    save_ae_cache(metadata, converge_time)
+                else:
+                    print(f"⚠️ 自动曝光 {converge_time:.2f} 秒内未收敛，继续捕获")
             
-            # 捕获一帧图像
+            # 捕获一帧图像：从请求的DMA缓冲区复制到复用的帧缓冲区
             print("捕获图像...")
-            frame = cam.capture_array()
-            print(f"✓ 图像捕获成功! 尺寸: {frame.shape}")
+            frame_buffer = capture_into(cam)
+            print(f"✓ 图像捕获成功! 尺寸: {frame_buffer.shape}")
             
             # 停止摄像头
             print("停止摄像头...")
@@ -96,10 +205,13 @@ try:
         else:
             print("⚠️ 未检测到摄像头")
             
+    except ImportError:
+        # 交给外层按导入失败处理
+        raise
     except Exception as e:
         print(f"✗ 摄像头操作失败: {e}")
         print("详细错误:")
-        traceback.print_exc()
+        print_exc()
         
     print("\n===== 独立摄像头测试完成 =====")
     
@@ -107,10 +219,10 @@ except ImportError as e:
     print(f"✗ picamera2导入失败: {e}")
     print("请检查符号链接或安装是否正确")
     print("详细错误:")
-    traceback.print_exc()
+    print_exc()
     sys.exit(1)
 except Exception as e:
     print(f"✗ 测试过程中出现未预期错误: {e}")
     print("详细错误:")
-    traceback.print_exc()
+    print_exc()
     sys.exit(1)
\ No newline at end of file
@@ -5,28 +5,78 @@
 import paho.mqtt.client as mqtt
 import json
 import time
+from collections import deque
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads  # json.loads 同样接受bytes
+
+# 网络线程只把原始消息放进队列，解码和打印在主线程进行
+PENDING_MAXLEN = 10000
+
+# 客户端流控参数（paho默认只允许20条未确认消息）
+MAX_INFLIGHT_MESSAGES = 100
+MAX_QUEUED_MESSAGES = 1000
+MESSAGE_RETRY_SECONDS = 5
 
 def on_message(client, userdata, msg):
-    """处理接收到的MQTT消息"""
+    """处理接收到的MQTT消息（仅入队，不在网络线程里解码）"""
+    userdata['queue'].append((msg.topic, msg.payload))
+
+def _handle_status(data):
+    """打印状态消息"""
+    print(f"状态更新: {data.get('status', '未知状态')}")
+
+def _handle_results(data):
+    """打印分拣结果消息"""
+    get = data.get
+    print(f"分拣结果 - 项目ID: {get('item_id', '未知')}, 等级: {get('grade', '未知')}, "
+          f"长度: {get('length', '未知')}mm, 直径: {get('diameter', '未知')}mm")
+
+# 一次SUBSCRIBE订阅全部主题；QoS 0，状态和结果丢一条无妨，省去PUBACK往返
+SUBSCRIPTIONS = [('pi_sorter/status', 0), ('pi_sorter/results', 0)]
+
+# 主题到处理函数的映射，避免逐条消息走if/elif判断
+HANDLERS = {
+    'pi_sorter/status': _handle_status,
+    'pi_sorter/results': _handle_results,
+}
+
+def handle_message(topic, payload):
+    """解码并打印一条消息"""
+    handler = HANDLERS.get(topic)
     try:
-        data = json.loads(msg.payload.decode('utf-8'))
-        if msg.topic == 'pi_sorter/status':
-            print(f"状态更新: {data.get('status', '未知状态')}")
-        elif msg.topic == 'pi_sorter/results':
-            item_id = data.get('item_id', '未知')
-            grade = data.get('grade', '未知')
-            length = data.get('length', '未知')
-            diameter = data.get('diameter', '未知')
-            print(f"分拣结果 - 项目ID: {item_id}, 等级: {grade}, 长度: {length}mm, 直径: {diameter}mm")
+        data = _loads(payload)
+        if handler is not None:
+            handler(data)
     except Exception as e:
-        print(f"{msg.topic}: {msg.payload.decode('utf-8', errors='ignore')}")
+        print(f"{topic}: {payload.decode('utf-8', errors='ignore')}")
+
+def drain(pending):
+    """处理队列中已收到的所有消息"""
+    while pending:
+        topic, payload = pending.popleft()
+        handle_message(topic, payload)
 
 def main():
     """主函数"""
     print("正在连接MQTT代理检查状态和结果...")
     
-    client = mqtt.Client()
+    pending = deque(maxlen=PENDING_MAXLEN)
+    userdata = {'queue': pending}
+    if hasattr(mqtt, 'CallbackAPIVersion'):
+        # paho-mqtt 2.x
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, userdata=userdata)
+    else:
+        client = mqtt.Client(userdata=userdata)
     client.on_message = on_message
+    client.max_inflight_messages_set(MAX_INFLIGHT_MESSAGES)
+    client.max_queued_messages_set(MAX_QUEUED_MESSAGES)
+    if hasattr(client, 'message_retry_set'):
+        # paho-mqtt 2.x 已移除该接口
+        client.message_retry_set(MESSAGE_RETRY_SECONDS)
     
     # 设置用户名密码
     client.username_pw_set('admin', 'admin1970')
@@ -36,27 +86,31 @@ def main():
         client.connect('voicevon.vicp.io', 1883, 60)
         print("✓ 已连接到MQTT代理")
         
-        # 订阅状态主题
-        client.subscribe('pi_sorter/status')
-        print("✓ 已订阅主题: pi_sorter/status")
-        
-        # 订阅结果主题
-        client.subscribe('pi_sorter/results')
-        print("✓ 已订阅主题: pi_sorter/results")
+        # 订阅状态和结果主题
+        client.subscribe(SUBSCRIPTIONS)
+        for topic, _ in SUBSCRIPTIONS:
+            print(f"✓ 已订阅主题: {topic}")
         
         # 开始循环
         client.loop_start()
         print("\n正在监听状态和结果消息，等待10秒...")
         
-        # 运行10秒
-        time.sleep(10)
-        
+        # 运行10秒，期间在主线程处理收到的消息
+        deadline = time.monotonic() + 10
+        while True:
+            drain(pending)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(0.1, remaining))
+    
     except Exception as e:
         print(f"错误: {e}")
     finally:
         client.loop_stop()
         client.disconnect()
+        drain(pending)
         print("已断开连接")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
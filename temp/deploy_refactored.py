@@ -8,10 +8,19 @@ import os
 import sys
 import json
 import time
+import select
 import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # 项目配置
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 REMOTE_PROJECT_DIR = "~/pi_sorter"
@@ -19,6 +28,25 @@ REMOTE_CONFIG_DIR = f"{REMOTE_PROJECT_DIR}/config"
 REMOTE_SRC_DIR = f"{REMOTE_PROJECT_DIR}/src/external"
 REMOTE_LOGS_DIR = f"{REMOTE_PROJECT_DIR}/logs"
 
+# 多条命令合并为一个远程脚本执行时，各段输出之间的分隔行
+SECTION_MARKER = "---PI_SORTER_SECTION---"
+
+# 系统进程的匹配模式。方括号让模式不匹配它自身，
+# 因此即使执行 pgrep/pkill 的远程shell命令行中含有该模式，也不会被误认为系统进程
+SYSTEM_PROCESS_PATTERN = "[m]ain_refactored|[i]ntegrated_system"
+
+# 逐个上传文件时的最大并发数
+MAX_UPLOAD_WORKERS = 8
+
+# 互不依赖的远程命令并发执行时的最大并发数（sshd默认每个连接最多10个会话）
+MAX_PARALLEL_COMMANDS = 8
+
+# SSH连接复用：第一次连接成为主连接，后续ssh/scp经本地套接字复用，不再重复握手和认证
+# Windows自带的OpenSSH不支持ControlMaster，在Windows上不启用
+SSH_MULTIPLEXING = os.name != 'nt'
+SSH_CONTROL_PATH = "/tmp/pi_sorter_cm-%r@%h:%p"
+SSH_CONTROL_PERSIST = "60s"
+
 # 默认配置
 DEFAULT_CONFIG = {
     "raspberry_pi_ip": "192.168.121.115",  # 需要根据实际情况修改
@@ -31,6 +59,52 @@ DEFAULT_CONFIG = {
 }
 
 
+def _parse_config_file(path: str) -> Dict[str, Any]:
+    """以bytes读取并解析配置文件，可用时使用orjson"""
+    data = Path(path).read_bytes()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _read_process_output(process: subprocess.Popen, input: Optional[bytes], timeout: float) -> tuple:
+    """
+    用select同时读取子进程的stdout和stderr，直到两个管道都关闭
+    
+    直接os.read到bytearray中，不经过communicate的线程和文本解码
+    """
+    deadline = time.monotonic() + timeout
+    
+    if input is not None:
+        # 远程脚本只有几KB，小于管道缓冲区，一次写完即可
+        try:
+            process.stdin.write(input)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+            
+    stdout_fd, stderr_fd = process.stdout.fileno(), process.stderr.fileno()
+    buffers = {stdout_fd: bytearray(), stderr_fd: bytearray()}
+    open_fds = [stdout_fd, stderr_fd]
+    while open_fds:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        ready, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in ready:
+            chunk = os.read(fd, 65536)
+            if chunk:
+                buffers[fd] += chunk
+            else:
+                open_fds.remove(fd)
+                
+    process.wait(timeout=max(deadline - time.monotonic(), 1))
+    process.stdout.close()
+    process.stderr.close()
+    return bytes(buffers[stdout_fd]), bytes(buffers[stderr_fd])
+
+
 class PiSorterDeployment:
     """Pi Sorter部署管理器"""
     
@@ -42,12 +116,16 @@ class PiSorterDeployment:
         self.ssh_key = self.config.get('ssh_key', DEFAULT_CONFIG['ssh_key'])
         self.ssh_user = self.config.get('ssh_user', DEFAULT_CONFIG['ssh_user'])
         
+        # ssh/scp命令前缀缓存，连接参数（如命令行--ip）变化时重建
+        self._prefix_key = None
+        self._ssh_prefix_cache = []
+        self._scp_prefix_cache = []
+        
     def _load_config(self) -> Dict[str, Any]:
         """加载部署配置"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return _parse_config_file(self.config_file)
             except Exception as e:
                 print(f"⚠️  加载配置文件失败: {e}，使用默认配置")
                 return DEFAULT_CONFIG.copy()
@@ -57,49 +135,157 @@ class PiSorterDeployment:
     def save_config(self):
         """保存部署配置"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # 先序列化出完整内容，再一次写入
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(self.config, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(self.config, indent=2, ensure_ascii=False).encode('utf-8')
+            Path(self.config_file).write_bytes(data)
             print(f"✅ 配置已保存到: {self.config_file}")
         except Exception as e:
             print(f"❌ 保存配置失败: {e}")
             
-    def _run_ssh_command(self, command: str, timeout: int = 30) -> tuple:
-        """运行SSH命令"""
-        ssh_command = [
-            "ssh",
+    def _ssh_options(self) -> list:
+        """ssh/scp共用的连接参数"""
+        options = [
             "-i", self.ssh_key,
             "-o", "ConnectTimeout=10",
             "-o", "StrictHostKeyChecking=no",
-            f"{self.ssh_user}@{self.raspberry_pi_ip}",
-            command
         ]
+        if SSH_MULTIPLEXING:
+            options += [
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={SSH_CONTROL_PATH}",
+                "-o", f"ControlPersist={SSH_CONTROL_PERSIST}",
+            ]
+        return options
+        
+    def _ssh_target(self) -> str:
+        """远程登录目标 user@host"""
+        return f"{self.ssh_user}@{self.raspberry_pi_ip}"
+        
+    def _refresh_prefixes(self):
+        """连接参数变化后重建ssh/scp命令前缀，未变化时沿用缓存"""
+        key = (self.ssh_key, self.ssh_user, self.raspberry_pi_ip)
+        if key != self._prefix_key:
+            options = self._ssh_options()
+            self._ssh_prefix_cache = ["ssh"] + options + [self._ssh_target()]
+            self._scp_prefix_cache = ["scp"] + options
+            self._prefix_key = key
+            
+    def _ssh_prefix(self) -> list:
+        """ssh命令前缀（含登录目标），后接远程命令即可执行"""
+        self._refresh_prefixes()
+        return self._ssh_prefix_cache
+        
+    def _scp_prefix(self) -> list:
+        """scp命令前缀（不含源和目标路径）"""
+        self._refresh_prefixes()
+        return self._scp_prefix_cache
+        
+    def close(self):
+        """关闭复用的SSH主连接"""
+        if not SSH_MULTIPLEXING:
+            return
+        try:
+            subprocess.run(
+                ["ssh", "-o", f"ControlPath={SSH_CONTROL_PATH}", "-O", "exit", self._ssh_target()],
+                capture_output=True, timeout=5
+            )
+        except Exception:
+            pass
+            
+    def _run_ssh_command(self, command: str, timeout: int = 30, input: Optional[str] = None) -> tuple:
+        """运行SSH命令"""
+        success, stdout, stderr = self._run_ssh_command_raw(
+            command, timeout=timeout, input=input.encode('utf-8') if input is not None else None
+        )
+        return success, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+        
+    def _run_ssh_command_raw(self, command: str, timeout: int = 30, input: Optional[bytes] = None) -> tuple:
+        """
+        运行SSH命令，返回未解码的输出
+        
+        Returns:
+            tuple: (是否成功, stdout字节, stderr字节)
+        """
+        ssh_command = self._ssh_prefix() + [command]
         
         try:
-            result = subprocess.run(ssh_command, capture_output=True, text=True, timeout=timeout)
-            return result.returncode == 0, result.stdout, result.stderr
+            process = subprocess.Popen(
+                ssh_command,
+                stdin=subprocess.PIPE if input is not None else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0
+            )
+        except Exception as e:
+            return False, b"", str(e).encode('utf-8')
+            
+        try:
+            if os.name == 'nt':
+                # Windows上select不支持管道
+                stdout, stderr = process.communicate(input, timeout=timeout)
+            else:
+                stdout, stderr = _read_process_output(process, input, timeout)
         except subprocess.TimeoutExpired:
-            return False, "", "命令执行超时"
+            process.kill()
+            process.wait()
+            return False, b"", "命令执行超时".encode('utf-8')
         except Exception as e:
-            return False, "", str(e)
+            process.kill()
+            process.wait()
+            return False, b"", str(e).encode('utf-8')
             
+        return process.returncode == 0, stdout, stderr
+        
+    def _run_ssh_commands_parallel(self, commands: list, timeout: int = 30) -> list:
+        """
+        并发执行互不依赖的远程命令
+        
+        启用连接复用时各命令是同一SSH连接上的不同会话，只握手认证一次
+        
+        Returns:
+            list: 与commands顺序一致的 (是否成功, stdout, stderr) 列表
+        """
+        if not commands:
+            return []
+        workers = min(len(commands), MAX_PARALLEL_COMMANDS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda cmd: self._run_ssh_command(cmd, timeout=timeout), commands))
+            
+    def _run_ssh_script(self, script: str, timeout: int = 30) -> tuple:
+        """
+        一次SSH往返执行多行脚本
+        
+        脚本经标准输入传给远程 bash -s，不出现在任何进程的命令行中，
+        因此脚本里的 pkill -f 不会匹配到执行脚本的shell自身
+        """
+        return self._run_ssh_command("bash -s", timeout=timeout, input=script)
+        
+    def _run_ssh_sections(self, commands: list, timeout: int = 30) -> tuple:
+        """
+        一次SSH往返执行多条命令，按命令拆分输出
+        
+        Returns:
+            tuple: (是否成功, 每条命令的输出列表（含stderr）, 整体stderr)
+        """
+        script = "\n".join(f"{{ {cmd}; }} 2>&1\necho '{SECTION_MARKER}'" for cmd in commands)
+        success, stdout, stderr = self._run_ssh_script(script, timeout=timeout)
+        sections = stdout.split(f"{SECTION_MARKER}\n")[:len(commands)]
+        sections += [""] * (len(commands) - len(sections))
+        return success, sections, stderr
+        
     def _run_scp_command(self, local_path: str, remote_path: str, direction: str = "upload") -> bool:
         """运行SCP命令"""
         if direction == "upload":
-            scp_command = [
-                "scp",
-                "-i", self.ssh_key,
-                "-o", "ConnectTimeout=10",
-                "-o", "StrictHostKeyChecking=no",
+            scp_command = self._scp_prefix() + [
                 local_path,
-                f"{self.ssh_user}@{self.raspberry_pi_ip}:{remote_path}"
+                f"{self._ssh_target()}:{remote_path}"
             ]
         else:  # download
-            scp_command = [
-                "scp",
-                "-i", self.ssh_key,
-                "-o", "ConnectTimeout=10",
-                "-o", "StrictHostKeyChecking=no",
-                f"{self.ssh_user}@{self.raspberry_pi_ip}:{remote_path}",
+            scp_command = self._scp_prefix() + [
+                f"{self._ssh_target()}:{remote_path}",
                 local_path
             ]
             
@@ -173,36 +359,97 @@ class PiSorterDeployment:
             ("requirements.txt", f"{REMOTE_PROJECT_DIR}/"),
         ]
         
-        success_count = 0
+        existing_files = []
         for local_file, remote_dir in files_to_deploy:
-            local_path = os.path.join(PROJECT_ROOT, local_file)
-            if not os.path.exists(local_path):
+            if not os.path.exists(os.path.join(PROJECT_ROOT, local_file)):
                 print(f"⚠️  文件不存在，跳过: {local_file}")
                 continue
-                
-            print(f"上传 {local_file}...")
-            if self._run_scp_command(local_path, remote_dir):
-                success_count += 1
-                print(f"✅ {local_file} 上传成功")
-            else:
-                print(f"❌ {local_file} 上传失败")
-                
+            existing_files.append((local_file, remote_dir))
+            
+        if not existing_files:
+            print(f"📊 文件部署完成: 0/{len(files_to_deploy)} 个文件成功")
+            return False
+            
+        # 本地相对路径与远程项目目录下的路径一一对应，整体打包后通过一个SSH连接解包
+        print(f"打包上传 {len(existing_files)} 个文件...")
+        if self._upload_tar([local_file for local_file, _ in existing_files], REMOTE_PROJECT_DIR):
+            success_count = len(existing_files)
+            print("✅ 打包上传成功")
+        else:
+            print("⚠️  打包上传失败，改为逐个上传")
+            success_count = self._upload_files_individually(existing_files)
+            
         print(f"📊 文件部署完成: {success_count}/{len(files_to_deploy)} 个文件成功")
         return success_count > 0
         
+    def _upload_tar(self, relative_paths: list, remote_dir: str, timeout: int = 120) -> bool:
+        """将PROJECT_ROOT下的多个文件打包，通过一次SSH连接在远程目录解包"""
+        tar_command = ["tar", "-cf", "-", "-C", PROJECT_ROOT] + relative_paths
+        ssh_command = self._ssh_prefix() + [f"mkdir -p {remote_dir} && tar -xf - -C {remote_dir}"]
+        
+        try:
+            tar = subprocess.Popen(tar_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ssh = subprocess.Popen(ssh_command, stdin=tar.stdout,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            tar.stdout.close()  # 由ssh独占管道读端，ssh提前退出时tar能收到SIGPIPE
+            
+            _, ssh_stderr = ssh.communicate(timeout=timeout)
+            tar_stderr = tar.stderr.read()
+            tar.wait(timeout=timeout)
+            
+            if tar.returncode != 0:
+                print(f"❌ 打包失败: {tar_stderr.decode(errors='replace')}")
+                return False
+            if ssh.returncode != 0:
+                print(f"❌ 远程解包失败: {ssh_stderr.decode(errors='replace')}")
+                return False
+            return True
+            
+        except subprocess.TimeoutExpired:
+            tar.kill()
+            ssh.kill()
+            print("❌ 打包上传超时")
+            return False
+        except Exception as e:
+            print(f"❌ 打包上传异常: {e}")
+            return False
+            
+    def _upload_files_individually(self, files: list) -> int:
+        """并发逐个上传文件（经复用的SSH连接），返回成功数量"""
+        if not files:
+            return 0
+            
+        success_count = 0
+        with ThreadPoolExecutor(max_workers=min(MAX_UPLOAD_WORKERS, len(files))) as executor:
+            futures = {
+                executor.submit(self._run_scp_command, os.path.join(PROJECT_ROOT, local_file), remote_dir): local_file
+                for local_file, remote_dir in files
+            }
+            for future in as_completed(futures):
+                local_file = futures[future]
+                if future.result():
+                    success_count += 1
+                    print(f"✅ {local_file} 上传成功")
+                else:
+                    print(f"❌ {local_file} 上传失败")
+        return success_count
+        
     def install_dependencies(self) -> bool:
         """安装依赖"""
         print("📦 安装依赖...")
         
-        commands = [
-            f"cd {REMOTE_PROJECT_DIR} && python3 -m pip install --user -r requirements.txt",
+        install_command = f"cd {REMOTE_PROJECT_DIR} && python3 -m pip install --user -r requirements.txt"
+        # 导入检查要在安装完成后进行，彼此之间互不依赖，可以并发
+        check_commands = [
             "python3 -c \"import picamera2; print('Picamera2版本:', picamera2.__version__)\"",
             "python3 -c \"import paho.mqtt.client; print('MQTT客户端已安装')\"",
         ]
         
-        for cmd in commands:
+        results = [self._run_ssh_command(install_command, timeout=120)]
+        results += self._run_ssh_commands_parallel(check_commands, timeout=120)
+        
+        for cmd, (success, stdout, stderr) in zip([install_command] + check_commands, results):
             print(f"执行: {cmd}")
-            success, stdout, stderr = self._run_ssh_command(cmd, timeout=120)
             if success:
                 print(f"✅ 命令成功")
                 if stdout:
@@ -217,19 +464,20 @@ class PiSorterDeployment:
         """配置系统"""
         print("⚙️  配置系统...")
         
-        # 配置摄像头
-        camera_config_commands = [
-            "sudo bash -c 'echo \"start_x=1\" >> /boot/firmware/config.txt'",
-            "sudo bash -c 'echo \"gpu_mem=128\" >> /boot/firmware/config.txt'",
-            "sudo bash -c 'echo \"# 手动启用CSI摄像头\" >> /boot/firmware/config.txt'",
-            "cat /boot/firmware/config.txt | grep -i camera"
-        ]
+        # 配置摄像头：一次SSH往返、一次sudo；行已存在则不再追加，重复部署不会让config.txt越来越长
+        camera_config_lines = ["start_x=1", "gpu_mem=128", "# 手动启用CSI摄像头"]
+        boot_config = "/boot/firmware/config.txt"
+        camera_config_script = "\n".join([
+            "for L in " + " ".join(f"'{line}'" for line in camera_config_lines) + "; do",
+            f"    grep -qxF \"$L\" {boot_config} || echo \"$L\" >> {boot_config}",
+            "done",
+            f"grep -i camera {boot_config}",
+        ])
         
         print("配置摄像头...")
-        for cmd in camera_config_commands:
-            success, stdout, stderr = self._run_ssh_command(cmd)
-            if success and stdout:
-                print(f"输出: {stdout.strip()}")
+        success, stdout, stderr = self._run_ssh_command("sudo bash -s", input=camera_config_script)
+        if success and stdout:
+            print(f"输出: {stdout.strip()}")
                 
         # 设置文件权限
         permission_commands = [
@@ -257,9 +505,10 @@ class PiSorterDeployment:
             f"cd {REMOTE_PROJECT_DIR} && python3 -c \"from src.external.mqtt_manager_refactored import SorterMQTTManager; print('MQTT管理器导入成功')\"",
         ]
         
-        for cmd in test_commands:
+        # 各项导入测试互不依赖，并发执行后按顺序输出结果
+        results = self._run_ssh_commands_parallel(test_commands)
+        for cmd, (success, stdout, stderr) in zip(test_commands, results):
             print(f"测试: {cmd}")
-            success, stdout, stderr = self._run_ssh_command(cmd)
             if success:
                 print(f"✅ 测试通过")
                 if stdout:
@@ -276,7 +525,7 @@ class PiSorterDeployment:
         print("🚀 启动Pi Sorter系统...")
         
         # 检查是否已有进程在运行
-        check_command = "ps aux | grep -E '(main_refactored|integrated_system)' | grep -v grep"
+        check_command = f"pgrep -af '{SYSTEM_PROCESS_PATTERN}' || true"
         success, stdout, stderr = self._run_ssh_command(check_command)
         
         if stdout.strip():
@@ -285,7 +534,7 @@ class PiSorterDeployment:
             response = input("是否终止现有进程并重新启动? (y/N): ")
             if response.lower() == 'y':
                 # 终止现有进程
-                kill_command = "pkill -f 'main_refactored|integrated_system'"
+                kill_command = f"pkill -f '{SYSTEM_PROCESS_PATTERN}'"
                 self._run_ssh_command(kill_command)
                 time.sleep(2)
             else:
@@ -303,7 +552,7 @@ class PiSorterDeployment:
             time.sleep(3)
             
             # 检查系统状态
-            status_command = "ps aux | grep main_refactored | grep -v grep"
+            status_command = "pgrep -af '[m]ain_refactored' || true"
             success, stdout, stderr = self._run_ssh_command(status_command)
             
             if success and stdout.strip():
@@ -329,28 +578,20 @@ class PiSorterDeployment:
         """停止系统"""
         print("🛑 停止Pi Sorter系统...")
         
-        # 查找并终止进程
-        commands = [
-            "pkill -f 'main_refactored'",
-            "pkill -f 'integrated_system'",
-            "pkill -f 'python3.*pi_sorter'"
-        ]
-        
-        for cmd in commands:
-            self._run_ssh_command(cmd)
-            
-        time.sleep(2)
-        
-        # 验证进程已终止
-        check_command = "ps aux | grep -E '(main_refactored|integrated_system)' | grep -v grep"
-        success, stdout, stderr = self._run_ssh_command(check_command)
+        # 查找并终止进程，等待2秒后验证，一次SSH往返完成
+        stop_script = "\n".join([
+            f"pkill -f '{SYSTEM_PROCESS_PATTERN}|python3.*pi_sorter'",
+            "sleep 2",
+            f"pgrep -af '{SYSTEM_PROCESS_PATTERN}'",
+        ])
+        success, stdout, stderr = self._run_ssh_script(stop_script)
         
         if not stdout.strip():
             print("✅ 系统已成功停止")
             return True
         else:
             print("⚠️  仍有进程在运行，尝试强制终止")
-            self._run_ssh_command("pkill -9 -f 'main_refactored|integrated_system'")
+            self._run_ssh_command(f"pkill -9 -f '{SYSTEM_PROCESS_PATTERN}'")
             return True
             
     def check_system_status(self) -> bool:
@@ -358,20 +599,21 @@ class PiSorterDeployment:
         print("📊 检查系统状态...")
         
         commands = [
-            "ps aux | grep -E '(main_refactored|integrated_system)' | grep -v grep",
+            f"pgrep -af '{SYSTEM_PROCESS_PATTERN}' || true",
             f"tail -n 10 {REMOTE_LOGS_DIR}/system.log",
             "systemctl status pigpiod 2>/dev/null || echo 'pigpiod 未运行'",
             "free -h",
             "df -h /"
         ]
         
-        for cmd in commands:
+        # 所有命令合并为一个远程脚本，一次SSH往返
+        success, outputs, stderr = self._run_ssh_sections(commands)
+        for cmd, output in zip(commands, outputs):
             print(f"\n执行: {cmd}")
-            success, stdout, stderr = self._run_ssh_command(cmd)
-            if success and stdout:
-                print(stdout)
-            if stderr:
-                print(f"错误: {stderr}")
+            if output:
+                print(output)
+        if stderr:
+            print(f"错误: {stderr}")
                 
         return True
         
@@ -379,15 +621,19 @@ class PiSorterDeployment:
         """查看日志"""
         print(f"📋 查看最近 {lines} 行日志...")
         
+        # 每次调用只运行一次tail，经复用的SSH主连接执行，无需重新握手
         log_command = f"tail -n {lines} {REMOTE_LOGS_DIR}/system.log"
-        success, stdout, stderr = self._run_ssh_command(log_command)
+        success, stdout, stderr = self._run_ssh_command_raw(log_command)
         
         if success and stdout:
             print("="*60)
-            print(stdout)
+            # 日志原样输出，不做解码
+            sys.stdout.flush()
+            sys.stdout.buffer.write(stdout if stdout.endswith(b"\n") else stdout + b"\n")
+            sys.stdout.buffer.flush()
             print("="*60)
         else:
-            print(f"❌ 无法读取日志: {stderr}")
+            print(f"❌ 无法读取日志: {stderr.decode('utf-8', errors='replace')}")
             
         return success
         
@@ -401,11 +647,11 @@ class PiSorterDeployment:
             ("tests/test_environment.py", f"{REMOTE_PROJECT_DIR}/tests/"),
         ]
         
-        for local_file, remote_dir in test_files:
-            local_path = os.path.join(PROJECT_ROOT, local_file)
-            if os.path.exists(local_path):
-                print(f"上传测试文件: {local_file}")
-                self._run_scp_command(local_path, remote_dir)
+        existing_files = [(local_file, remote_dir) for local_file, remote_dir in test_files
+                          if os.path.exists(os.path.join(PROJECT_ROOT, local_file))]
+        if existing_files:
+            print(f"上传测试文件: {', '.join(local_file for local_file, _ in existing_files)}")
+            self._upload_files_individually(existing_files)
                 
         # 运行测试
         test_command = f"cd {REMOTE_PROJECT_DIR} && python3 -m pytest tests/test_comprehensive.py -v"
@@ -446,6 +692,14 @@ def main():
     if args.ip:
         deployment.raspberry_pi_ip = args.ip
         
+    try:
+        return _run_actions(deployment, args, parser)
+    finally:
+        deployment.close()
+
+
+def _run_actions(deployment: PiSorterDeployment, args, parser) -> int:
+    """按命令行参数执行操作"""
     # 检查连接
     if not deployment.check_connection():
         print("❌ 无法连接到树莓派，请检查网络和配置")
@@ -1,5 +1,11 @@
 import json
-import os
+from pathlib import Path
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # 修复后的MQTT配置
 config = {
@@ -35,11 +41,15 @@ config = {
     }
 }
 
+CONFIG_PATH = Path("~/pi_sorter/config/mqtt_config.json").expanduser()
+
 # 确保目录存在
-os.makedirs(os.path.dirname("~/pi_sorter/config/mqtt_config.json"), exist_ok=True)
+CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-# 写入配置文件
-with open("~/pi_sorter/config/mqtt_config.json", "w") as f:
-    json.dump(config, f, indent=2)
+# 写入配置文件（一次性生成完整内容后单次写入）
+if ORJSON_AVAILABLE:
+    CONFIG_PATH.write_bytes(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+else:
+    CONFIG_PATH.write_text(json.dumps(config, indent=2), encoding='utf-8')
 
 print("MQTT配置文件修复完成")
\ No newline at end of file
@@ -4,14 +4,35 @@
 Asparagus sorting system main program - fixed version
 """
 
+import importlib
 import logging
+import queue
 import sys
 import os
 import signal
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+try:
+    import RPi.GPIO as GPIO
+    GPIO_AVAILABLE = True
+except ImportError:
+    GPIO = None
+    GPIO_AVAILABLE = False
+
+# 主进程LED心跳：1Hz、50%占空比（亮0.5秒、灭0.5秒）
+HEARTBEAT_FREQUENCY = 1
+HEARTBEAT_DUTY_CYCLE = 50
+# PWM不可用时改由定时器翻转LED的间隔
+LED_TOGGLE_INTERVAL = 0.5
+# 检查分拣处理是否仍在运行的间隔
+PROCESSING_CHECK_INTERVAL = 5.0
+# 环境检查时并发预加载的模块；RPi.GPIO为可选，未安装不影响检查结果
+PRELOAD_MODULES = ('numpy', 'yaml', 'paho.mqtt.client', 'RPi.GPIO')
+
 # 添加src目录到Python路径
 current_dir = Path(__file__).parent
 src_dir = current_dir / "src"
@@ -28,12 +49,22 @@ class AsparagusSystemFixed:
     def __init__(self):
         """初始化系统"""
         self.logger = logging.getLogger(__name__)
-        self.system_running = True
+        self._log_listener: Optional[QueueListener] = None
+        self._stop_event = threading.Event()
+        self._timers: Dict[str, threading.Timer] = {}
+        self._main_led_on = False
+        self._heartbeat_pwm = None
+        self._heartbeat_pwm_failed = False
         self.config_manager = ConfigManager()
         self.integrated_system: Optional[IntegratedSorterSystem] = None
         self.main_led_pin = 16  # 主进程监控LED引脚
         self.encoder_led_pin = 27  # 编码器监控LED引脚
         
+        # LED初始化成功后绑定的GPIO函数和电平常量，主循环中直接调用
+        self._gpio_output = None
+        self._high = None
+        self._low = None
+        
         # 注册信号处理器
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -41,7 +72,7 @@ class AsparagusSystemFixed:
     def _signal_handler(self, signum: int, frame: Any) -> None:
         """信号处理器"""
         self.logger.info(f"接收到信号 {signum}，准备关闭系统...")
-        self.system_running = False
+        self._stop_event.set()
     
     def _setup_logging(self, log_level: str = "INFO") -> None:
         """设置日志配置"""
@@ -50,43 +81,75 @@ class AsparagusSystemFixed:
         
         level = getattr(logging, log_level.upper(), logging.INFO)
         
-        logging.basicConfig(
-            level=level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_dir / "asparagus_sorter.log"),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [
+            logging.FileHandler(log_dir / "asparagus_sorter.log"),
+            logging.StreamHandler(sys.stdout)
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            
+        # 记录日志的线程只把记录放入队列，文件写入由监听线程完成，SD卡刷盘不再阻塞主循环
+        log_queue = queue.Queue(-1)
+        self._log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._log_listener.start()
+        
+        # 格式化交给监听端的处理器，队列端只保留原始消息，避免basicConfig套上默认格式
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.basicConfig(level=level, handlers=[queue_handler])
     
     def _check_environment(self) -> bool:
         """检查运行环境"""
-        try:
-            import numpy as np
-            self.logger.info(f"NumPy版本: {np.__version__}")
-        except ImportError:
+        modules = self._preload_modules()
+        
+        np = modules['numpy']
+        if np is None:
             self.logger.error("NumPy未安装")
             return False
+        self.logger.info(f"NumPy版本: {np.__version__}")
         
-        try:
-            import yaml
+        yaml = modules['yaml']
+        if yaml is not None:
             self.logger.info("YAML支持可用")
-        except ImportError:
+            if hasattr(yaml, 'CSafeLoader'):
+                self.logger.info("YAML使用libyaml C加载器")
+            else:
+                # ARM上的PyYAML wheel可能未带libyaml，可安装libyaml-dev后
+                # 用 pip install --no-binary pyyaml pyyaml 重新编译安装
+                self.logger.warning("libyaml不可用，YAML将使用纯Python加载器，配置解析较慢")
+        else:
             self.logger.warning("YAML未安装，将使用JSON配置")
         
-        try:
-            import paho.mqtt.client as mqtt
+        if modules['paho.mqtt.client'] is not None:
             self.logger.info("MQTT客户端可用")
-        except ImportError:
+        else:
             self.logger.warning("MQTT客户端未安装，MQTT功能将不可用")
         
         return True
     
+    def _preload_modules(self) -> Dict[str, Any]:
+        """并发导入环境检查用到的模块，未安装的模块对应None"""
+        # 模块体的执行仍受导入锁串行化，但.pyc读取和.so加载可以重叠，缩短Pi上的启动时间
+        modules: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=len(PRELOAD_MODULES)) as executor:
+            futures = {name: executor.submit(importlib.import_module, name)
+                       for name in PRELOAD_MODULES}
+            for name, future in futures.items():
+                try:
+                    modules[name] = future.result()
+                except (ImportError, RuntimeError):
+                    # RPi.GPIO在非树莓派上导入会抛RuntimeError
+                    modules[name] = None
+        return modules
+    
     def _setup_led_monitoring(self) -> bool:
         """设置LED监控"""
-        try:
-            import RPi.GPIO as GPIO
+        if not GPIO_AVAILABLE:
+            self.logger.warning("RPi.GPIO未安装，LED监控功能将不可用")
+            return False
             
+        try:
             # 设置GPIO模式
             GPIO.setmode(GPIO.BCM)
             
@@ -98,33 +161,93 @@ class AsparagusSystemFixed:
             GPIO.output(self.main_led_pin, GPIO.LOW)
             GPIO.output(self.encoder_led_pin, GPIO.LOW)
             
+            self._gpio_output = GPIO.output
+            self._high = GPIO.HIGH
+            self._low = GPIO.LOW
+            
             self.logger.info(f"LED监控初始化成功，主进程LED使用GPIO{self.main_led_pin}，编码器LED使用GPIO{self.encoder_led_pin}")
             return True
             
-        except ImportError:
-            self.logger.warning("RPi.GPIO未安装，LED监控功能将不可用")
-            return False
         except Exception as e:
             self.logger.error(f"LED监控初始化失败: {str(e)}")
             return False
     
-    def _monitor_main_process(self) -> None:
-        """监控主进程状态"""
+    def _schedule(self, name: str, interval: float, func) -> None:
+        """在interval秒后于定时器线程中执行func；系统已停止时不再安排"""
+        if self._stop_event.is_set():
+            return
+        timer = threading.Timer(interval, func)
+        timer.daemon = True
+        self._timers[name] = timer
+        timer.start()
+    
+    def _cancel_timers(self) -> None:
+        """取消所有尚未触发的定时器"""
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+    
+    def _start_heartbeat(self) -> bool:
+        """
+        用RPi.GPIO的PWM驱动主进程LED心跳
+        
+        电平翻转在RPi.GPIO的C线程中完成，Python侧不再需要定时唤醒
+        """
         try:
-            import RPi.GPIO as GPIO
+            self._heartbeat_pwm = GPIO.PWM(self.main_led_pin, HEARTBEAT_FREQUENCY)
+            self._heartbeat_pwm.start(HEARTBEAT_DUTY_CYCLE)
+            return True
+        except Exception as e:
+            self.logger.warning(f"LED心跳PWM启动失败，改用定时器闪烁: {str(e)}")
+            self._heartbeat_pwm = None
+            self._heartbeat_pwm_failed = True
+            return False
+    
+    def _stop_heartbeat(self) -> None:
+        """停止LED心跳PWM"""
+        if self._heartbeat_pwm is not None:
+            try:
+                self._heartbeat_pwm.stop()
+            except Exception:
+                pass
+            self._heartbeat_pwm = None
+    
+    def _monitor_main_process(self) -> None:
+        """监控主进程状态：主进程LED以1Hz闪烁表示系统运行正常"""
+        if self._gpio_output is None:
+            return
             
-            # 主进程LED闪烁表示系统运行正常
-            if self.system_running:
-                GPIO.output(self.main_led_pin, GPIO.HIGH)
-                time.sleep(0.5)
-                GPIO.output(self.main_led_pin, GPIO.LOW)
-                time.sleep(0.5)
-            else:
+        try:
+            if self._stop_event.is_set():
                 # 系统关闭时保持常亮
-                GPIO.output(self.main_led_pin, GPIO.HIGH)
+                self._stop_heartbeat()
+                self._gpio_output(self.main_led_pin, self._high)
+                return
+                
+            if self._heartbeat_pwm is not None:
+                return
+            if not self._heartbeat_pwm_failed and self._start_heartbeat():
+                return
                 
+            # PWM不可用时由定时器逐次翻转
+            self._main_led_on = not self._main_led_on
+            self._gpio_output(self.main_led_pin, self._high if self._main_led_on else self._low)
         except Exception:
             pass
+            
+        self._schedule('led', LED_TOGGLE_INTERVAL, self._monitor_main_process)
+    
+    def _check_processing(self) -> None:
+        """检查分拣处理是否仍在运行，已停止时结束主循环"""
+        try:
+            if not self.integrated_system.is_running:
+                self.logger.warning("分拣处理已停止")
+                self._stop_event.set()
+                return
+        except Exception as e:
+            self.logger.error(f"主循环错误: {str(e)}")
+            
+        self._schedule('processing', PROCESSING_CHECK_INTERVAL, self._check_processing)
     
     def initialize(self) -> bool:
         """初始化系统"""
@@ -191,27 +314,19 @@ class AsparagusSystemFixed:
             self.logger.info("分拣处理已启动")
             self.logger.info("系统正在运行，按Ctrl+C退出...")
             
-            # 主循环
-            while self.system_running:
-                try:
-                    # 监控主进程状态
-                    self._monitor_main_process()
-                    
-                    # 检查系统状态
-                    if not self.integrated_system.is_running:
-                        self.logger.warning("分拣处理已停止")
-                        break
-                    
-                    # 短暂休眠，避免CPU占用过高
-                    time.sleep(0.1)
-                    
-                except KeyboardInterrupt:
-                    self.logger.info("用户中断程序")
-                    break
-                except Exception as e:
-                    self.logger.error(f"主循环错误: {str(e)}")
-                    time.sleep(1)
+            # LED闪烁和状态检查由各自的定时器按自己的节奏执行，
+            # 主线程只阻塞等待停止事件，不再每0.1秒轮询一次
+            self._monitor_main_process()
+            self._schedule('processing', PROCESSING_CHECK_INTERVAL, self._check_processing)
             
+            try:
+                self._stop_event.wait()
+            except KeyboardInterrupt:
+                self.logger.info("用户中断程序")
+                self._stop_event.set()
+            finally:
+                self._cancel_timers()
+                
             return 0
             
         except Exception as e:
@@ -229,13 +344,14 @@ class AsparagusSystemFixed:
                 self.integrated_system.shutdown()
             
             # 清理GPIO
-            try:
-                import RPi.GPIO as GPIO
-                GPIO.output(self.main_led_pin, GPIO.LOW)
-                GPIO.output(self.encoder_led_pin, GPIO.LOW)
-                GPIO.cleanup()
-            except Exception:
-                pass
+            if self._gpio_output is not None:
+                try:
+                    self._stop_heartbeat()
+                    self._gpio_output(self.main_led_pin, self._low)
+                    self._gpio_output(self.encoder_led_pin, self._low)
+                    GPIO.cleanup()
+                except Exception:
+                    pass
             
             self.logger.info("系统关闭完成")
             
@@ -243,6 +359,13 @@ class AsparagusSystemFixed:
             self.logger.error(f"关闭错误: {str(e)}")
         finally:
             self.logger.info("芦笋分拣系统关闭")
+            self._stop_log_listener()
+    
+    def _stop_log_listener(self) -> None:
+        """停止日志监听线程，写完队列中剩余的日志"""
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
 
 
 def main() -> int:
@@ -6,12 +6,19 @@ Pi Sorter - 重构版本主程序
 
 import os
 import sys
-import time
 import signal
+import asyncio
+import queue
 import logging
 import argparse
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
+# 状态发布和健康检查各自的周期（秒）
+STATUS_PUBLISH_INTERVAL = 30
+HEALTH_CHECK_INTERVAL = 10
+
 # 添加项目路径
 sys.path.append(os.path.join(os.path.dirname(__file__), 'external'))
 
@@ -19,6 +26,20 @@ from integrated_sorting_system import IntegratedSortingSystem
 from config_manager_refactored import ConfigManager
 
 
+@lru_cache(maxsize=None)
+def _get_test_loader():
+    """测试加载器，只在测试模式下才导入unittest"""
+    import unittest
+    return unittest.TestLoader()
+
+
+@lru_cache(maxsize=None)
+def _get_test_runner(verbosity: int = 2):
+    """测试运行器，只在测试模式下才导入unittest"""
+    import unittest
+    return unittest.TextTestRunner(verbosity=verbosity)
+
+
 class MainSystem:
     """主系统类"""
     
@@ -28,30 +49,54 @@ class MainSystem:
         self.is_running = False
         self.shutdown_requested = False
         
+        # run_system运行期间的事件循环和关闭事件
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shutdown_event: Optional[asyncio.Event] = None
+        
         # 设置信号处理
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
         # 设置日志
+        self._log_listener: Optional[QueueListener] = None
         self._setup_logging()
         self.logger = logging.getLogger(__name__)
         
     def _setup_logging(self):
         """设置日志系统"""
         log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        logging.basicConfig(
-            level=logging.INFO,
-            format=log_format,
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler('logs/main_system.log')
-            ]
-        )
+        formatter = logging.Formatter(log_format)
+        handlers = [
+            logging.StreamHandler(),
+            logging.FileHandler('logs/main_system.log')
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            
+        # 记录日志的线程只把记录放入队列，文件写入由监听线程完成
+        log_queue = queue.Queue(-1)
+        self._log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._log_listener.start()
+        
+        # 格式化交给监听端的处理器，队列端只保留原始消息，避免basicConfig套上默认格式
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+        
+    def stop_logging(self):
+        """停止日志监听线程，写完队列中剩余的日志"""
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
         
     def _signal_handler(self, signum, frame):
         """信号处理"""
         self.logger.info(f"接收到信号 {signum}，开始优雅关闭")
         self.shutdown_requested = True
+        loop, shutdown_event = self._loop, self._shutdown_event
+        if loop is not None and shutdown_event is not None:
+            # 唤醒正在等待的事件循环
+            loop.call_soon_threadsafe(shutdown_event.set)
         
     def parse_arguments(self):
         """解析命令行参数"""
@@ -169,24 +214,8 @@ class MainSystem:
                 
             self.is_running = True
             
-            # 主循环
-            while self.is_running and not self.shutdown_requested:
-                try:
-                    # 定期发布系统状态
-                    if hasattr(self.sorting_system, 'mqtt_manager') and self.sorting_system.mqtt_manager:
-                        self.sorting_system.mqtt_manager.publish_system_status("系统运行正常")
-                        
-                    # 检查系统健康状态
-                    self._check_system_health()
-                    
-                    time.sleep(30)  # 每30秒检查一次
-                    
-                except KeyboardInterrupt:
-                    self.logger.info("用户中断，开始关闭系统")
-                    break
-                except Exception as e:
-                    self.logger.error(f"主循环错误: {e}")
-                    time.sleep(5)
+            # 状态发布和健康检查各按自己的周期运行，互不阻塞
+            asyncio.run(self._run_monitor_loops())
                     
             self.logger.info("主循环结束")
             return True
@@ -195,6 +224,49 @@ class MainSystem:
             self.logger.error(f"系统运行失败: {e}")
             return False
             
+    async def _run_monitor_loops(self):
+        """在一个事件循环中并发运行状态发布和健康检查，直到收到关闭请求"""
+        # 先创建事件再登记事件循环，信号处理函数看到_loop时事件一定已存在
+        self._shutdown_event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self.shutdown_requested or not self.is_running:
+            self._shutdown_event.set()
+            
+        try:
+            await asyncio.gather(self._publish_status_loop(), self._health_loop())
+        finally:
+            self._loop = None
+            
+    async def _wait_for_shutdown(self, timeout: float) -> bool:
+        """等待关闭请求，最多timeout秒；收到关闭请求返回True"""
+        try:
+            await asyncio.wait_for(self._shutdown_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+            
+    async def _publish_status_loop(self):
+        """定期发布系统状态"""
+        mqtt_manager = getattr(self.sorting_system, 'mqtt_manager', None)
+        while not self._shutdown_event.is_set():
+            if mqtt_manager:
+                try:
+                    # 发布可能阻塞在网络上，放到线程池执行，不影响健康检查
+                    await self._loop.run_in_executor(None, mqtt_manager.publish_system_status, "系统运行正常")
+                except Exception as e:
+                    self.logger.error(f"主循环错误: {e}")
+                    
+            if await self._wait_for_shutdown(STATUS_PUBLISH_INTERVAL):
+                break
+                
+    async def _health_loop(self):
+        """定期检查系统健康状态"""
+        while not self._shutdown_event.is_set():
+            await self._loop.run_in_executor(None, self._check_system_health)
+            
+            if await self._wait_for_shutdown(HEALTH_CHECK_INTERVAL):
+                break
+                
     def _check_system_health(self):
         """检查系统健康状态"""
         try:
@@ -236,16 +308,14 @@ class MainSystem:
         try:
             self.logger.info("运行测试模式")
             
-            # 运行单元测试
-            import unittest
+            # 运行单元测试（测试模块只在--test时导入）
             from test_refactored_modules import TestSystemMonitor
             
             # 创建测试套件
-            suite = unittest.TestLoader().loadTestsFromTestCase(TestSystemMonitor)
+            suite = _get_test_loader().loadTestsFromTestCase(TestSystemMonitor)
             
             # 运行测试
-            runner = unittest.TextTestRunner(verbosity=2)
-            result = runner.run(suite)
+            result = _get_test_runner().run(suite)
             
             if result.wasSuccessful():
                 self.logger.info("所有测试通过")
@@ -254,6 +324,9 @@ class MainSystem:
                 self.logger.error(f"测试失败: {len(result.failures)} 失败, {len(result.errors)} 错误")
                 return False
                 
+        except ImportError as e:
+            self.logger.error(f"测试模块导入失败: {e}")
+            return False
         except Exception as e:
             self.logger.error(f"测试模式运行失败: {e}")
             return False
@@ -306,7 +379,10 @@ class MainSystem:
 def main():
     """主入口函数"""
     main_system = MainSystem()
-    exit_code = main_system.main()
+    try:
+        exit_code = main_system.main()
+    finally:
+        main_system.stop_logging()
     sys.exit(exit_code)
 
 
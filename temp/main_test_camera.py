@@ -4,14 +4,19 @@
 Asparagus sorting system main program - test version, camera only
 """
 
+import importlib
 import logging
 import sys
 import os
 import signal
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+# 环境检查时并发预加载的模块；RPi.GPIO为可选，未安装不影响检查结果
+PRELOAD_MODULES = ('numpy', 'yaml', 'paho.mqtt.client', 'RPi.GPIO')
+
 # 添加src目录到Python路径
 current_dir = Path(__file__).parent
 src_dir = current_dir / "src"
@@ -59,27 +64,48 @@ class AsparagusSystemTest:
     
     def _check_environment(self) -> bool:
         """检查运行环境"""
-        try:
-            import numpy as np
-            self.logger.info(f"NumPy版本: {np.__version__}")
-        except ImportError:
+        modules = self._preload_modules()
+        
+        np = modules['numpy']
+        if np is None:
             self.logger.error("NumPy未安装")
             return False
+        self.logger.info(f"NumPy版本: {np.__version__}")
         
-        try:
-            import yaml
+        yaml = modules['yaml']
+        if yaml is not None:
             self.logger.info("YAML支持可用")
-        except ImportError:
+            if hasattr(yaml, 'CSafeLoader'):
+                self.logger.info("YAML使用libyaml C加载器")
+            else:
+                # ARM上的PyYAML wheel可能未带libyaml，可安装libyaml-dev后
+                # 用 pip install --no-binary pyyaml pyyaml 重新编译安装
+                self.logger.warning("libyaml不可用，YAML将使用纯Python加载器，配置解析较慢")
+        else:
             self.logger.warning("YAML未安装，将使用JSON配置")
         
-        try:
-            import paho.mqtt.client as mqtt
+        if modules['paho.mqtt.client'] is not None:
             self.logger.info("MQTT客户端可用")
-        except ImportError:
+        else:
             self.logger.warning("MQTT客户端未安装，MQTT功能将不可用")
         
         return True
     
+    def _preload_modules(self) -> Dict[str, Any]:
+        """并发导入环境检查用到的模块，未安装的模块对应None"""
+        # 模块体的执行仍受导入锁串行化，但.pyc读取和.so加载可以重叠，缩短Pi上的启动时间
+        modules: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=len(PRELOAD_MODULES)) as executor:
+            futures = {name: executor.submit(importlib.import_module, name)
+                       for name in PRELOAD_MODULES}
+            for name, future in futures.items():
+                try:
+                    modules[name] = future.result()
+                except (ImportError, RuntimeError):
+                    # RPi.GPIO在非树莓派上导入会抛RuntimeError
+                    modules[name] = None
+        return modules
+    
     def initialize(self) -> bool:
         """初始化系统"""
         try:
@@ -1,16 +1,32 @@
 import logging
+import time
+from typing import List, Optional, Tuple
 from picamera2 import Picamera2
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# global_camera_info()要走一次libcamera设备枚举，短时间内重复调用时复用结果
+CAMERA_INFO_TTL = 5.0
+_CAM_INFO_CACHE: Optional[Tuple[float, List[dict]]] = None
+
+def get_camera_info(ttl: float = CAMERA_INFO_TTL) -> List[dict]:
+    """获取摄像头列表，ttl秒内重复调用直接返回缓存"""
+    global _CAM_INFO_CACHE
+    now = time.monotonic()
+    if _CAM_INFO_CACHE is not None and now - _CAM_INFO_CACHE[0] < ttl:
+        return _CAM_INFO_CACHE[1]
+    cameras = Picamera2.global_camera_info()
+    _CAM_INFO_CACHE = (now, cameras)
+    return cameras
+
 def test_minimal():
     logger.info("最小化Picamera2测试...")
     
     try:
         # 列出可用的摄像头
-        cameras = Picamera2.global_camera_info()
+        cameras = get_camera_info()
         logger.info(f"找到摄像头数量: {len(cameras)}")
         for i, cam_info in enumerate(cameras):
             logger.info(f"摄像头 {i}: {cam_info}")
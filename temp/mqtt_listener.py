@@ -3,30 +3,44 @@
 简单的MQTT监听器，用于调试图像数据格式
 """
 import paho.mqtt.client as mqtt
-import time
+import logging
+import signal
 import sys
+import threading
+
+# 每条消息只输出一条日志记录；十六进制内容只在DEBUG级别（-v）下生成
+logger = logging.getLogger("mqtt_listener")
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
 
 def on_message(client, userdata, msg):
-    print(f"\n=== 收到MQTT消息 ===")
-    print(f"主题: {msg.topic}")
-    print(f"消息大小: {len(msg.payload)} 字节")
+    payload = msg.payload
+    size = len(payload)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    lines = [f"\n=== 收到MQTT消息 ===\n主题: {msg.topic}\n消息大小: {size} 字节"]
     
     # 检查消息类型
-    if len(msg.payload) > 100:
+    if size > 100:
         # 大消息，可能是图像
-        print("消息类型: 可能是图像数据")
-        print(f"前20字节 (hex): {msg.payload[:20].hex()}")
-        print(f"JPEG文件头检查: {msg.payload[:2].hex()} (期望: ffd8)")
-        print(f"JPEG文件尾检查: {msg.payload[-2:].hex()} (期望: ffd9)")
+        lines.append("消息类型: 可能是图像数据")
+        lines.append(f"JPEG文件头检查: {'正确' if payload[:2] == JPEG_SOI else '错误'} (期望: ffd8)")
+        lines.append(f"JPEG文件尾检查: {'正确' if payload[-2:] == JPEG_EOI else '错误'} (期望: ffd9)")
+        if debug:
+            lines.append(f"前20字节 (hex): {payload[:20].hex()}")
+            lines.append(f"文件头/尾 (hex): {payload[:2].hex()} / {payload[-2:].hex()}")
     else:
         # 小消息，可能是文本
-        print("消息类型: 文本消息")
+        lines.append("消息类型: 文本消息")
         try:
-            text_content = msg.payload.decode('utf-8')
-            print(f"文本内容: {text_content[:200]}")
+            text_content = payload.decode('utf-8')
+            lines.append(f"文本内容: {text_content[:200]}")
         except UnicodeDecodeError:
-            print("无法解码为文本，可能是二进制数据")
-            print(f"内容 (hex): {msg.payload[:50].hex()}")
+            lines.append("无法解码为文本，可能是二进制数据")
+            if debug:
+                lines.append(f"内容 (hex): {payload[:50].hex()}")
+                
+    logger.info("\n".join(lines))
 
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
@@ -37,10 +51,21 @@ def on_connect(client, userdata, flags, rc):
         print(f"连接失败，错误码: {rc}")
 
 def main():
+    logging.basicConfig(
+        level=logging.DEBUG if '-v' in sys.argv else logging.INFO,
+        format='%(message)s',
+        stream=sys.stdout
+    )
+    
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
     
+    # 网络收发在loop_start的线程中进行，主线程只需阻塞等待退出信号
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    
     try:
         print("连接到MQTT代理 voicevon.vicp.io:1883...")
         client.connect("voicevon.vicp.io", 1883, 60)
@@ -48,10 +73,8 @@ def main():
         client.loop_start()
         print("开始监听消息，按 Ctrl+C 退出...")
         
-        while True:
-            time.sleep(1)
-            
-    except KeyboardInterrupt:
+        stop_event.wait()
+        
         print("\n正在退出...")
         client.loop_stop()
         client.disconnect()
@@ -4,10 +4,68 @@
 直接使用v4l2接口测试/dev/video设备
 """
 
+import os
 import sys
+import stat
+import glob
 import time
+import threading
 import traceback
 
+# 加 -v 参数时才输出/dev下的设备列表等诊断信息
+VERBOSE = '-v' in sys.argv
+
+# 树莓派上的编解码器/ISP节点也是/dev/video*，但不能采集图像，按sysfs中的设备名跳过
+NON_CAPTURE_NAME_KEYWORDS = ("codec", "isp", "hevc", "pispbe", "embedded")
+
+# 单帧读取的超时时间（秒）；配置异常的节点上cap.read()可能永久阻塞
+FRAME_READ_TIMEOUT = 2.0
+
+
+def list_video_devices():
+    """列出实际存在的/dev/videoN设备号（按数字排序），不再盲目探测0~9"""
+    device_ids = []
+    for path in glob.glob("/dev/video*"):
+        suffix = path[len("/dev/video"):]
+        if suffix.isdigit():
+            device_ids.append(int(suffix))
+    return sorted(device_ids)
+
+
+def read_frame_with_timeout(cap, timeout=FRAME_READ_TIMEOUT):
+    """
+    在后台线程中调用cap.read()，最多等待timeout秒
+
+    Returns:
+        (ret, frame)；超时返回None
+    """
+    result = []
+    # 守护线程：读取一直卡住时也不会阻止脚本退出
+    reader = threading.Thread(target=lambda: result.append(cap.read()), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    return result[0] if result else None
+
+
+def print_video_device_entries():
+    """打印/dev下video设备的权限和设备号，直接读目录，不调用ls"""
+    entries = sorted(
+        (entry for entry in os.scandir("/dev") if entry.name.startswith("video")),
+        key=lambda entry: entry.name
+    )
+    for entry in entries:
+        st = entry.stat()
+        print(f"{stat.filemode(st.st_mode)} {os.major(st.st_rdev):>4}, {os.minor(st.st_rdev):<4} /dev/{entry.name}")
+
+
+def get_video_device_name(device_id):
+    """读取sysfs中的设备名，读取失败返回空字符串"""
+    try:
+        with open(f"/sys/class/video4linux/video{device_id}/name", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
 print("===== OpenCV摄像头测试开始 =====")
 print(f"Python版本: {sys.version}")
 
@@ -22,17 +80,20 @@ except ImportError:
 
 try:
     # 列出所有可用的视频设备
-    print("\n检测视频设备...")
-    import subprocess
-    result = subprocess.run(["ls", "-la", "/dev/video*"], capture_output=True, text=True)
-    print("视频设备列表:")
-    print(result.stdout)
+    if VERBOSE:
+        print("\n检测视频设备...")
+        print("视频设备列表:")
+        print_video_device_entries()
     
-    # 尝试打开每个视频设备
-    max_devices = 10
+    # 只尝试打开实际存在的视频设备
     found_camera = False
     
-    for device_id in range(max_devices):
+    for device_id in list_video_devices():
+        device_name = get_video_device_name(device_id)
+        if any(keyword in device_name.lower() for keyword in NON_CAPTURE_NAME_KEYWORDS):
+            print(f"\n跳过 /dev/video{device_id} ({device_name})：不是采集设备")
+            continue
+            
         print(f"\n尝试打开摄像头 {device_id} (/dev/video{device_id})...")
         cap = cv2.VideoCapture(device_id, cv2.CAP_V4L2)
         
@@ -49,7 +110,12 @@ try:
             
             # 尝试捕获一帧
             print("  尝试捕获一帧...")
-            ret, frame = cap.read()
+            read_result = read_frame_with_timeout(cap)
+            if read_result is None:
+                # 读取线程仍阻塞在该设备上，此时release可能同样被阻塞，直接跳过
+                print(f"  ✗ 捕获超时（{FRAME_READ_TIMEOUT}秒），跳过该设备")
+                continue
+            ret, frame = read_result
             if ret:
                 print(f"  ✓ 成功捕获图像! 尺寸: {frame.shape}")
                 # 保存图像用于验证
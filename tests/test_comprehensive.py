@@ -59,8 +59,9 @@ class TestConfigManager(unittest.TestCase):
             
     def tearDown(self):
         """测试后清理"""
-        if os.path.exists(self.test_config_path):
-            os.unlink(self.test_config_path)
+        for path in (self.test_config_path, self.test_config_path + ".cache.json"):
+            if os.path.exists(path):
+                os.unlink(path)
             
     def test_load_configuration(self):
         """测试配置加载"""
@@ -115,6 +116,26 @@ class TestConfigManager(unittest.TestCase):
         new_manager.load_configuration()
         system_config = new_manager.get_system_configuration()
         self.assertEqual(system_config['name'], 'Updated System')
+        
+    def test_yaml_cache_used_until_file_changes(self):
+        """测试YAML配置的JSON缓存"""
+        manager = ConfigManager(self.test_config_path, validation_enabled=False)
+        self.assertTrue(manager.load_configuration())
+        self.assertTrue(os.path.exists(self.test_config_path + ".cache.json"))
+        
+        # 配置文件未变化时直接读取缓存，不再解析YAML
+        with patch('config_manager_refactored.yaml.load') as mock_yaml_load:
+            new_manager = ConfigManager(self.test_config_path, validation_enabled=False)
+            self.assertTrue(new_manager.load_configuration())
+            mock_yaml_load.assert_not_called()
+        self.assertEqual(new_manager.get_system_configuration()['name'], 'Test System')
+        
+        # 配置文件变化后重新解析
+        with open(self.test_config_path, 'a') as f:
+            f.write("extra: 1\n")
+        new_manager = ConfigManager(self.test_config_path, validation_enabled=False)
+        self.assertTrue(new_manager.load_configuration())
+        self.assertEqual(new_manager.get_configuration_value('extra'), 1)
 
 
 class TestCSICameraManager(unittest.TestCase):
@@ -13,7 +13,8 @@ import sys
 sys.path.append('c:/my_source/pi_sorter/src/external')
 
 from config_manager_refactored import ConfigManager, ConfigFormat, ValidationResult
-from picamera2_module_refactored import CSICamera, CSICameraManager, CSICameraLegacy
+from picamera2_module_refactored import (CSICamera, CSICameraManager, CSICameraLegacy, SharedFrameRing,
+                                         mean_intensity, roi_sum)
 from mqtt_manager_refactored import MQTTManager, SorterMQTTManager
 from encoder_module_refactored import RotaryEncoder, EncoderManager, EncoderModule
 
@@ -362,6 +363,397 @@ class TestCSICamera(unittest.TestCase):
         self.assertFalse(result)
 
 
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_reconfigure_buffer_count(self, mock_picamera2):
+        """测试重新配置缓冲区数量"""
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        
+        camera = CSICamera(camera_id=0, resolution=(1280, 1024))
+        camera.initialize()
+        
+        result = camera.reconfigure(mode="video", buffer_count=6)
+        
+        self.assertTrue(result)
+        self.assertEqual(camera.buffer_count, 6)
+        self.assertEqual(camera.capture_mode, "video")
+        mock_camera.create_video_configuration.assert_called_with(
+            main={"size": (1280, 1024), "format": "RGB888"}, buffer_count=6
+        )
+        
+        # 无效模式应被拒绝
+        self.assertFalse(camera.reconfigure(mode="preview"))
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_capture_mono_y_plane(self, mock_picamera2):
+        """测试mono模式返回Y平面跨步视图"""
+        import numpy as np
+        
+        width, height, stride = 6, 4, 8
+        mock_camera = Mock()
+        mock_camera.stream_configuration.return_value = {"stride": stride}
+        buffer = np.arange(stride * height * 3 // 2, dtype=np.uint8)
+        mock_camera.capture_buffer.return_value = buffer
+        mock_picamera2.return_value = mock_camera
+        
+        camera = CSICamera(camera_id=0, resolution=(width, height), color_mode="mono")
+        self.assertTrue(camera.initialize())
+        
+        frame = camera.capture_image()
+        
+        self.assertEqual(frame.shape, (height, width))
+        self.assertTrue(np.shares_memory(frame, buffer))
+        self.assertEqual(frame[1, 0], stride)
+        mock_camera.create_still_configuration.assert_called_with(
+            main={"size": (width, height), "format": "YUV420"}, buffer_count=4
+        )
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_save_image_does_not_recapture(self, mock_picamera2):
+        """测试保存已捕获图像时不会再次触发传感器捕获"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        
+        image_path = os.path.join(self.temp_dir, 'frame.jpg')
+        with patch.object(camera, '_write_jpeg') as mock_write:
+            result = camera.save_image(image_path, np.zeros((4, 8, 3), dtype=np.uint8))
+            
+        self.assertTrue(result)
+        mock_write.assert_called_once()
+        mock_camera.capture_file.assert_not_called()
+
+
+    @patch('picamera2_module_refactored.SIMPLEJPEG_AVAILABLE', False)
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_capture_with_save_path_keeps_colors(self, mock_picamera2, mock_mapped_array):
+        """测试capture_image(save_path=...)保存的帧颜色正确，且不再调用capture_file"""
+        import numpy as np
+        import cv2
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        # RGB888数据流在内存中按B,G,R排列，纯红色为(0, 0, 255)
+        red = np.zeros((16, 16, 3), dtype=np.uint8)
+        red[..., 2] = 255
+        mapped = MagicMock()
+        mapped.__enter__.return_value.array = red
+        mock_mapped_array.return_value = mapped
+        
+        camera = CSICamera(camera_id=0, resolution=(16, 16), color_mode="rgb")
+        camera.initialize()
+        image_path = os.path.join(self.temp_dir, 'captured.jpg')
+        self.assertIsNotNone(camera.capture_image(save_path=image_path))
+        camera.release_camera()
+        
+        mock_camera.capture_file.assert_not_called()
+        decoded = cv2.imread(image_path)
+        blue, green, red_mean = (decoded[..., i].mean() for i in range(3))
+        self.assertGreater(red_mean, 200)
+        self.assertLess(blue, 50)
+        self.assertLess(green, 50)
+
+
+    def test_get_latest_frame_view(self):
+        """测试获取最新帧默认返回只读视图"""
+        import numpy as np
+        
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        self.assertIsNone(camera.get_latest_frame())
+        
+        camera.latest_frame = np.zeros((4, 8, 3), dtype=np.uint8)
+        
+        view = camera.get_latest_frame()
+        self.assertTrue(np.shares_memory(view, camera.latest_frame))
+        self.assertFalse(view.flags.writeable)
+        
+        copied = camera.get_latest_frame(copy=True)
+        self.assertFalse(np.shares_memory(copied, camera.latest_frame))
+        self.assertTrue(copied.flags.writeable)
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_capture_burst(self, mock_picamera2, mock_mapped_array):
+        """测试连拍复用预分配缓冲区"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        mapped = MagicMock()
+        mapped.__enter__.return_value.array = np.ones((4, 8, 3), dtype=np.uint8)
+        mock_mapped_array.return_value = mapped
+        
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        
+        frames = camera.capture_burst(3)
+        
+        self.assertEqual(frames.shape, (3, 4, 8, 3))
+        self.assertTrue((frames == 1).all())
+        self.assertEqual(mock_camera.capture_request.return_value.release.call_count, 3)
+        
+        # 再次连拍复用同一缓冲区
+        again = camera.capture_burst(2)
+        self.assertTrue(np.shares_memory(frames, again))
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_capture_image_reuses_scratch(self, mock_picamera2, mock_mapped_array):
+        """测试单帧捕获复用预分配的暂存槽位"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        mapped = MagicMock()
+        mapped.__enter__.return_value.array = np.full((4, 8, 3), 7, dtype=np.uint8)
+        mock_mapped_array.return_value = mapped
+        
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        slots = list(camera._scratch)
+        
+        frames = [camera.capture_image() for _ in range(len(slots) + 1)]
+        
+        self.assertTrue((frames[0] == 7).all())
+        self.assertIs(camera.latest_frame, frames[-1])
+        self.assertIs(frames[-1], frames[0])
+        self.assertTrue(all(any(f is slot for slot in slots) for f in frames))
+        mock_camera.capture_array.assert_not_called()
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_callback_runs_off_capture_thread(self, mock_picamera2, mock_mapped_array):
+        """测试帧回调在独立的分发线程中执行"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        mapped = MagicMock()
+        mapped.__enter__.return_value.array = np.zeros((4, 8, 3), dtype=np.uint8)
+        mock_mapped_array.return_value = mapped
+        
+        received = threading.Event()
+        callback_threads = []
+        
+        def on_frame(frame):
+            callback_threads.append(threading.current_thread().name)
+            received.set()
+            
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        self.assertTrue(camera.start_continuous_capture(on_frame))
+        
+        self.assertTrue(received.wait(timeout=2.0))
+        camera.stop_continuous_capture()
+        
+        self.assertEqual(callback_threads[0], "CameraDispatch")
+        self.assertFalse(camera.dispatch_thread.is_alive())
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_slow_callback_frame_not_overwritten(self, mock_picamera2, mock_mapped_array):
+        """测试回调处理过慢时，正在读取的帧不被捕获覆盖且按顺序分发"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        sequence = iter(range(1, 256))
+        
+        def mapped_frame(request, stream):
+            mapped = MagicMock()
+            mapped.__enter__.return_value.array = np.full((4, 8, 3), next(sequence), dtype=np.uint8)
+            return mapped
+        mock_mapped_array.side_effect = mapped_frame
+        
+        delivered = []
+        torn = []
+        
+        def on_frame(frame):
+            value = int(frame[0, 0, 0])
+            time.sleep(0.1)
+            if not (frame == value).all():
+                torn.append(value)
+            delivered.append(value)
+            
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        self.assertTrue(camera.start_continuous_capture(on_frame))
+        time.sleep(0.6)
+        camera.stop_continuous_capture()
+        
+        self.assertTrue(delivered)
+        self.assertEqual(torn, [])
+        self.assertEqual(delivered, sorted(set(delivered)))
+        self.assertEqual(camera._callback_held, set())
+
+
+    @patch('picamera2_module_refactored.SIMPLEJPEG_AVAILABLE', False)
+    def test_save_image_rgb_keeps_channel_order(self):
+        """测试rgb模式保存的JPEG颜色正确（RGB888在内存中按B,G,R排列）"""
+        import numpy as np
+        import cv2
+        
+        # 纯红色帧，按摄像头内存布局为(B, G, R) = (0, 0, 255)
+        frame = np.zeros((16, 16, 3), dtype=np.uint8)
+        frame[..., 2] = 255
+        
+        camera = CSICamera(camera_id=0, resolution=(16, 16), color_mode="rgb")
+        file_path = os.path.join(self.temp_dir, "red.jpg")
+        self.assertTrue(camera.save_image(file_path, frame))
+        
+        decoded = cv2.imread(file_path)
+        blue, green, red = (decoded[..., i].mean() for i in range(3))
+        self.assertGreater(red, 200)
+        self.assertLess(blue, 50)
+        self.assertLess(green, 50)
+        
+    @patch('picamera2_module_refactored.SIMPLEJPEG_AVAILABLE', True)
+    @patch('picamera2_module_refactored.simplejpeg', create=True)
+    def test_save_image_simplejpeg_uses_bgr(self, mock_simplejpeg):
+        """测试simplejpeg按BGR编码摄像头内存布局的帧"""
+        import numpy as np
+        
+        mock_simplejpeg.encode_jpeg.return_value = b"jpeg"
+        frame = np.zeros((16, 16, 3), dtype=np.uint8)
+        frame[..., 2] = 255
+        
+        camera = CSICamera(camera_id=0, resolution=(16, 16), color_mode="rgb")
+        file_path = os.path.join(self.temp_dir, "red.jpg")
+        self.assertTrue(camera.save_image(file_path, frame))
+        
+        args = mock_simplejpeg.encode_jpeg.call_args[0]
+        self.assertEqual(args[2], 'BGR')
+        self.assertTrue((args[0][..., 2] == 255).all())
+
+
+    def test_pack_yuv420_strips_stride_padding(self):
+        """测试YUV420帧去掉行跨度填充后得到紧凑的I420数据"""
+        import numpy as np
+        
+        width, height, stride = 10, 6, 16
+        y = np.arange(height * width, dtype=np.uint8).reshape(height, width)
+        u = np.full((height // 2, width // 2), 100, dtype=np.uint8)
+        v = np.full((height // 2, width // 2), 200, dtype=np.uint8)
+        
+        # 按libcamera布局填充：Y每行stride字节，U/V每行stride/2字节
+        y_padded = np.zeros((height, stride), dtype=np.uint8)
+        y_padded[:, :width] = y
+        u_padded = np.zeros((height // 2, stride // 2), dtype=np.uint8)
+        u_padded[:, :width // 2] = u
+        v_padded = np.zeros((height // 2, stride // 2), dtype=np.uint8)
+        v_padded[:, :width // 2] = v
+        frame = np.concatenate([y_padded.ravel(), u_padded.ravel(), v_padded.ravel()])
+        frame = frame.reshape(height * 3 // 2, stride)
+        
+        camera = CSICamera(camera_id=0, resolution=(width, height), color_mode="yuv420")
+        packed = camera._pack_yuv420(frame)
+        
+        expected = np.concatenate([y.ravel(), u.ravel(), v.ravel()]).reshape(height * 3 // 2, width)
+        np.testing.assert_array_equal(packed, expected)
+        self.assertIs(camera._pack_yuv420(expected), expected)
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.MappedArray', create=True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_numba_callback_results(self, mock_picamera2, mock_mapped_array):
+        """测试注册的处理内核在分发线程中执行并保存结果"""
+        import numpy as np
+        
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        mapped = MagicMock()
+        mapped.__enter__.return_value.array = np.full((4, 8, 3), 2, dtype=np.uint8)
+        mock_mapped_array.return_value = mapped
+        
+        camera = CSICamera(camera_id=0, resolution=(8, 4))
+        camera.initialize()
+        self.assertTrue(camera.register_numba_callback(mean_intensity))
+        self.assertTrue(camera.register_numba_callback(roi_sum, 0, 0, 2, 2, name="roi"))
+        self.assertTrue(camera.start_continuous_capture())
+        
+        deadline = time.time() + 2.0
+        while "roi" not in camera.kernel_results and time.time() < deadline:
+            time.sleep(0.01)
+        camera.stop_continuous_capture()
+        
+        self.assertAlmostEqual(camera.kernel_results["mean_intensity"], 2.0)
+        self.assertAlmostEqual(camera.kernel_results["roi"], 24.0)
+
+
+    @patch('picamera2_module_refactored.PICAMERA2_AVAILABLE', True)
+    @patch('picamera2_module_refactored.Picamera2', create=True)
+    def test_apply_parameters_single_set_controls(self, mock_picamera2):
+        """测试参数通过一次set_controls调用下发"""
+        mock_camera = Mock()
+        mock_picamera2.return_value = mock_camera
+        
+        camera = CSICamera(camera_id=0, resolution=(1280, 1024))
+        camera.initialize()
+        # 未显式设置参数时不覆盖libcamera默认值
+        mock_camera.set_controls.assert_not_called()
+        
+        result = camera.set_camera_parameters(brightness=0.75, contrast=1.2, exposure_time=1000)
+        
+        self.assertTrue(result)
+        mock_camera.set_controls.assert_called_once_with({
+            "Brightness": 0.5,
+            "Contrast": 1.2,
+            "AeEnable": False,
+            "ExposureTime": 1000,
+        })
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    """共享内存帧环单元测试"""
+    
+    def test_write_and_attach(self):
+        """测试生产者写入、消费者按名称读取"""
+        import numpy as np
+        
+        producer = SharedFrameRing.create('pi_sorter_test_ring', (4, 6, 3), ring_size=3)
+        consumer = SharedFrameRing.attach('pi_sorter_test_ring')
+        try:
+            self.assertIsNone(consumer.read_latest())
+            self.assertEqual(consumer.shape, (4, 6, 3))
+            self.assertEqual(consumer.ring_size, 3)
+            
+            for value in range(5):
+                seq = producer.write(np.full((4, 6, 3), value, dtype=np.uint8))
+                
+            frame, latest_seq, timestamp = consumer.read_latest()
+            self.assertEqual(latest_seq, seq)
+            self.assertTrue((frame == 4).all())
+            self.assertGreater(timestamp, 0)
+            
+            # 绕回后旧序号的槽位已被覆盖
+            self.assertTrue(consumer.is_valid(latest_seq))
+            self.assertFalse(consumer.is_valid(latest_seq - 3))
+            del frame
+        finally:
+            consumer.close()
+            producer.close()
+
+
 class TestCSICameraManager(unittest.TestCase):
     """CSI摄像头管理器单元测试"""
     
@@ -431,6 +823,21 @@ class TestCSICameraManager(unittest.TestCase):
         
         self.assertEqual(len(self.manager.list_cameras()), 0)
         
+    def test_release_all_cameras_parallel_result(self):
+        """测试并行释放所有摄像头并正确统计结果"""
+        good = MagicMock()
+        good.release_camera.return_value = True
+        bad = MagicMock()
+        bad.release_camera.return_value = False
+        self.manager.cameras = {'camera1': good, 'camera2': bad}
+        
+        result = self.manager.release_all_cameras()
+        
+        self.assertFalse(result)
+        good.release_camera.assert_called_once()
+        bad.release_camera.assert_called_once()
+        self.assertEqual(len(self.manager.cameras), 0)
+        
     def test_camera_manager_context_manager(self):
         """测试摄像头管理器上下文管理器"""
         with patch('picamera2_module_refactored.Picamera2'):